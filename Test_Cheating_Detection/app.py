@@ -1,47 +1,235 @@
+import asyncio
+import hashlib
+import json
 import time
-import shutil
+from contextlib import asynccontextmanager
 
-from fastapi import APIRouter, Form, UploadFile, File, HTTPException, FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Form, UploadFile, File, HTTPException, FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 import os
-import uuid
-from Test_Cheating_Detection.detection import process_candidate_exam
-from Test_Cheating_Detection.generate_pics_from_videos import extract_frames
+from Test_Cheating_Detection.jobs import submit_job, get_job, get_future, warm_pool, submit_live_frame, LIVE_MAX_FRAME_BYTES
+from Test_Cheating_Detection.metrics import snapshot, render_prometheus
+from Test_Cheating_Detection.config import analysis_params
+from Test_Cheating_Detection.rescoring import rescore_recording
+from Test_Cheating_Detection.live import LiveMonitor
+from common.result_cache import cache_key
+from common.uploads import save_upload, copy_upload, get_upload
+from common.workspace import create_workspace, remove_workspace
 from fastapi.middleware.cors import CORSMiddleware
 
 router = APIRouter()
 
-VIDEO_DIR = "Test_Cheating_Detection\\videos"
-os.makedirs(VIDEO_DIR, exist_ok=True)
+@asynccontextmanager
+async def lifespan(app):
+    # Start the worker pool with the server; registered on the app, not the
+    # router, so it runs once however many apps include the router
+    warm_pool()
+    yield
 
-@router.post("/check-cheating/")
-async def upload_video(file: UploadFile = File(...), candidate_name: str = Form(...)):
+ALLOWED_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+
+def video_extension(filename):
     # Validate extension
-    allowed_extensions = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
-    ext = os.path.splitext(file.filename)[-1].lower()
+    ext = os.path.splitext(filename)[-1].lower()
 
-    if ext not in allowed_extensions:
+    if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Unsupported video format.")
-    vid= candidate_name + ext
-    print(vid)
-    # Save with candidate name and UUID
-    save_path = os.path.join(VIDEO_DIR, f"{vid}")
-    print(save_path)
-    with open(save_path, "wb") as buffer:
-        buffer.write(await file.read())
-    path = "Test_Cheating_Detection\\frames" if os.name == "nt" else "Test_Cheating_Detection/frames"
-    candidate_directory = os.path.join(path, candidate_name)
-    # Extract frames from the uploaded video
-    extract_frames(save_path, candidate_directory, 2)
-    time.sleep(2)
-    res=process_candidate_exam(candidate_name)
-    print(res)
-    time.sleep(3)
-    shutil.rmtree(path)
-    os.remove(save_path)
+    return ext
+
+async def save_video(file):
+    """
+    Save the upload into a fresh per-job workspace, which the job removes when done.
+
+    Returns:
+        tuple: (video path, workspace, sha256 of the video)
+    """
+    ext = video_extension(file.filename)
+    workspace = create_workspace("proctor")
+    save_path = os.path.join(workspace, f"video{ext}")
+    hasher = hashlib.sha256()
+    try:
+        await save_upload(file, save_path, hasher=hasher)
+    except BaseException:
+        remove_workspace(workspace)
+        raise
+    return save_path, workspace, hasher.hexdigest()
+
+@router.post("/check-cheating/")
+async def upload_video(file: UploadFile = File(...), candidate_name: str = Form(...), adaptive: bool = Form(False)):
+    save_path, workspace, content_hash = await save_video(file)
+    # Analysis runs on the worker pool, the event loop only waits for it;
+    # a video analyzed before with the same settings comes from the cache
+    job_id = submit_job(candidate_name, save_path, 2, adaptive, workspace, cache_key(content_hash, analysis_params(2, adaptive)))
+    try:
+        await asyncio.wrap_future(get_future(job_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Proctoring failed: {str(e)}")
+    res = get_job(job_id)["result"]
+    return JSONResponse(content=res)
+
+@router.post("/check-cheating/jobs")
+async def submit_video(file: UploadFile = File(...), candidate_name: str = Form(...), adaptive: bool = Form(False)):
+    save_path, workspace, content_hash = await save_video(file)
+    job_id = submit_job(candidate_name, save_path, 2, adaptive, workspace, cache_key(content_hash, analysis_params(2, adaptive)))
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": get_job(job_id)["status"]})
+
+@router.post("/check-cheating/jobs/from-upload")
+async def submit_upload(upload_id: str = Form(...), candidate_name: str = Form(...), adaptive: bool = Form(False)):
+    # Works on resumable uploads, including ones still in progress: the bytes
+    # received so far are analyzed (a streamable container such as webm is needed)
+    meta = get_upload(upload_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    ext = video_extension(meta["filename"])
+    workspace = create_workspace("proctor")
+    save_path = os.path.join(workspace, f"video{ext}")
+    hasher = hashlib.sha256()
+    try:
+        # The upload may be deleted or swept between get_upload and the copy
+        meta = await run_in_threadpool(copy_upload, upload_id, save_path, hasher)
+    except BaseException:
+        remove_workspace(workspace)
+        raise
+    job_id = submit_job(candidate_name, save_path, 2, adaptive, workspace, cache_key(hasher.hexdigest(), analysis_params(2, adaptive)))
+    return JSONResponse(status_code=202, content={
+        "job_id": job_id,
+        "status": get_job(job_id)["status"],
+        "bytes_analyzed": meta["offset"],
+        "partial": not meta["complete"]
+    })
+
+@router.get("/check-cheating/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return JSONResponse(content=job)
+
+@router.get("/check-cheating/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    async def events():
+        # Server-sent events: one message per status change, the last one carries the result
+        last_status = None
+        while True:
+            job = get_job(job_id)
+            if job is None:
+                break
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: {last_status}\ndata: {json.dumps(job)}\n\n"
+            if last_status in ("completed", "failed"):
+                break
+            future = get_future(job_id)
+            if future is not None:
+                await asyncio.wait({asyncio.wrap_future(future)}, timeout=1)
+            else:
+                await asyncio.sleep(1)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.websocket("/live")
+async def live_proctoring(websocket: WebSocket):
+    # The browser sends JPEG frames as binary messages during the exam and
+    # receives alert messages back; the text message "end" closes the session
+    # with a summary. Only the newest frame waits for analysis: frames that
+    # arrive while one is being analyzed replace each other, so latency stays
+    # bounded however long the exam runs.
+    await websocket.accept()
+    monitor = LiveMonitor()
+    started = time.monotonic()
+    latest = {"frame": None, "timestamp": None}
+    frame_ready = asyncio.Event()
+    closed = False
+
+    async def receive():
+        nonlocal closed
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if data is None:
+                    if message.get("text") == "end":
+                        break
+                    continue
+                if len(data) > LIVE_MAX_FRAME_BYTES:
+                    monitor.invalid += 1
+                    continue
+                if latest["frame"] is not None:
+                    monitor.dropped += 1
+                latest["frame"], latest["timestamp"] = data, time.monotonic() - started
+                frame_ready.set()
+        finally:
+            closed = True
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive())
+    try:
+        while True:
+            if latest["frame"] is None:
+                if closed:
+                    break
+                frame_ready.clear()
+                await frame_ready.wait()
+                continue
+
+            data, timestamp = latest["frame"], latest["timestamp"]
+            latest["frame"] = None
+            try:
+                result = await asyncio.wrap_future(submit_live_frame(data))
+            except Exception as e:
+                # A frame the worker failed on (or a broken pool) must not end the session
+                print(f"Live frame: Error -> {e}")
+                result = None
+            if result is None:
+                monitor.invalid += 1
+                continue
+            for alert in monitor.update(result, timestamp):
+                alert["latency_ms"] = round((time.monotonic() - started - timestamp) * 1000, 1)
+                await websocket.send_json(alert)
+
+        await websocket.send_json(monitor.summary())
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away mid-session; nothing left to report to
+        pass
+    finally:
+        receiver.cancel()
+        # Collects the receiver's CancelledError or its own disconnect error
+        await asyncio.gather(receiver, return_exceptions=True)
+
+@router.post("/rescore")
+async def rescore(request: Request):
+    # Apply new detection rules to the stored detections of an analyzed video,
+    # in milliseconds and without the vision models
+    data = await request.json()
+    recording_id = data.get("recording_id")
+    policy = data.get("policy") or {}
+    if not recording_id or not isinstance(recording_id, str):
+        raise HTTPException(status_code=400, detail="A valid 'recording_id' field is required.")
+    if not isinstance(policy, dict):
+        raise HTTPException(status_code=400, detail="'policy' must be an object.")
+    try:
+        res = rescore_recording(recording_id, data.get("candidate_name"), policy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if res is None:
+        raise HTTPException(status_code=404, detail="Recording not found.")
     return JSONResponse(content=res)
 
-app = FastAPI()
+@router.get("/metrics")
+async def proctor_metrics(format: str = "json"):
+    # Totals over every video analyzed by this server, per stage
+    if format == "prometheus":
+        return PlainTextResponse(render_prometheus())
+    return JSONResponse(content=snapshot())
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
 
 app.add_middleware(
@@ -0,0 +1,239 @@
+import glob
+import os
+import shutil
+import socket
+import tempfile
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+from Test_Cheating_Detection.config import MODEL_DIR, YOLO_IMGSZ
+
+# "torch" runs the .pt weights directly; the other DETECTOR_BACKENDS run an
+# exported copy, created on first use and cached in MODEL_DIR
+SAMPLE_VIDEO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
+CALIBRATION_FRAMES = 64
+
+
+def sample_video():
+    """
+    Path of the bundled sample exam recording.
+    """
+    videos = sorted(glob.glob(os.path.join(SAMPLE_VIDEO_DIR, "*")))
+    if not videos:
+        raise FileNotFoundError(f"No sample video in {SAMPLE_VIDEO_DIR}")
+    return videos[0]
+
+
+def sample_frames(count, interval=1, video_path=None):
+    """
+    Up to count frames of the sample video, one every interval seconds.
+    """
+    from Test_Cheating_Detection.generate_pics_from_videos import iter_frames
+
+    frames = []
+    for _, _, frame in iter_frames(video_path or sample_video(), interval):
+        frames.append(frame)
+        if len(frames) >= count:
+            break
+    return frames
+
+
+def model_path(variant, backend, imgsz=YOLO_IMGSZ):
+    """
+    Where the weights of a variant are kept for a backend.
+    """
+    if backend == "torch":
+        return f"yolov8{variant}.pt"
+    if backend == "onnx":
+        return os.path.join(MODEL_DIR, f"yolov8{variant}-{imgsz}.onnx")
+    if backend == "onnx-int8":
+        return os.path.join(MODEL_DIR, f"yolov8{variant}-{imgsz}-int8.onnx")
+    if backend == "openvino":
+        return os.path.join(MODEL_DIR, f"yolov8{variant}-{imgsz}_openvino_model")
+    if backend == "openvino-int8":
+        return os.path.join(MODEL_DIR, f"yolov8{variant}-{imgsz}-int8_openvino_model")
+    raise ValueError(f"Unsupported detector backend: {backend}")
+
+
+def _same_file(a, b):
+    # Inode numbers are reused right away, the modification time tells the files apart
+    return (a.st_dev, a.st_ino, a.st_mtime_ns) == (b.st_dev, b.st_ino, b.st_mtime_ns)
+
+
+def _lock_is_stale(lock_path, judged, timeout):
+    """
+    Whether an export lock was left behind: its owner on this host has exited,
+    or it is older than timeout (an owner on another host, or a hung export).
+    judged is the os.stat of the lock file being looked at.
+    """
+    try:
+        with open(lock_path) as f:
+            host, pid, created = f.read().split()
+        pid, created = int(pid), float(created)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError):
+        # Not written yet by its owner, or unreadable; fall back to the file's age
+        host, pid, created = None, None, judged.st_mtime
+    if time.time() - created > timeout:
+        return True
+    if host == socket.gethostname():
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+    return False
+
+
+def _break_lock(lock_path, judged):
+    """
+    Remove a stale lock, but only the file that was judged stale: another
+    waiter may already have broken it and taken a new, live lock.
+    """
+    # The rename is atomic, so exactly one waiter gets hold of any given lock file
+    moved = f"{lock_path}.{socket.gethostname()}.{os.getpid()}.stale"
+    try:
+        os.rename(lock_path, moved)
+    except FileNotFoundError:
+        return
+    if _same_file(os.stat(moved), judged):
+        print(f"Breaking stale export lock {lock_path}")
+        os.remove(moved)
+        return
+    # A live lock: put it back unless yet another process has locked meanwhile
+    try:
+        os.link(moved, lock_path)
+    except FileExistsError:
+        pass
+    os.remove(moved)
+
+
+@contextmanager
+def _export_lock(path, timeout=1800):
+    """
+    Every worker process loads the detector at start-up; only one of them
+    exports. The lock file records its owner's host, PID and creation time, so
+    a lock left by a killed export is broken instead of blocking every start-up.
+    """
+    lock_path = f"{path}.lock"
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                judged = os.stat(lock_path)
+            except FileNotFoundError:
+                continue
+            if _lock_is_stale(lock_path, judged, timeout):
+                _break_lock(lock_path, judged)
+                continue
+            time.sleep(1)
+    try:
+        os.write(fd, f"{socket.gethostname()} {os.getpid()} {time.time()}".encode())
+        yield
+    finally:
+        # Our lock may itself have been broken as stale; never remove someone else's
+        try:
+            if _same_file(os.fstat(fd), os.stat(lock_path)):
+                os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def ensure_model(variant, backend, imgsz=YOLO_IMGSZ):
+    """
+    Export the detector for a backend unless it already is, and return the
+    path ultralytics.YOLO should load.
+    """
+    path = model_path(variant, backend, imgsz)
+    if backend == "torch" or os.path.exists(path):
+        return path
+
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    with _export_lock(path):
+        if os.path.exists(path):
+            return path
+        print(f"Exporting yolov8{variant} for the {backend} backend to {path}")
+        if backend == "onnx-int8":
+            quantize_onnx(ensure_model(variant, "onnx", imgsz), path, sample_frames(CALIBRATION_FRAMES), imgsz)
+        else:
+            _export(variant, backend, imgsz, path)
+    return path
+
+
+def _export(variant, backend, imgsz, path):
+    from ultralytics import YOLO
+
+    # ultralytics writes the export next to the weights, under a name without
+    # imgsz; exporting a private copy keeps concurrent exports at other sizes apart
+    workdir = tempfile.mkdtemp(prefix=f"{os.path.basename(path)}.", dir=MODEL_DIR)
+    try:
+        weights = YOLO(f"yolov8{variant}.pt").ckpt_path or f"yolov8{variant}.pt"
+        model = YOLO(shutil.copy(weights, workdir))
+        if backend == "onnx":
+            # Dynamic axes, so one file serves every batch size
+            exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        else:
+            # OpenVINO calibrates int8 itself, on ultralytics' small COCO sample set
+            exported = model.export(format="openvino", imgsz=imgsz, dynamic=True, int8=backend == "openvino-int8", data="coco8.yaml")
+        shutil.move(exported, path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def preprocess(frame, imgsz):
+    """
+    Letterbox a BGR frame the way ultralytics does: RGB, NCHW, float32 in [0, 1].
+    """
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    resized = cv2.resize(frame, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top = (imgsz - resized.shape[0]) // 2
+    left = (imgsz - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+
+
+def quantize_onnx(fp32_path, int8_path, calibration_frames, imgsz=YOLO_IMGSZ):
+    """
+    Static int8 (QDQ) quantization of an exported detector with ONNX Runtime,
+    calibrated on real exam frames. The Detect head stays in float: quantizing
+    its box decoding costs far more accuracy than it saves time.
+    """
+    import onnx
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    # Nodes are named "/model.<layer>/..."; the last layer is the Detect head
+    node_names = [node.name for node in onnx.load(fp32_path).graph.node]
+    layers = [int(name.split("/")[1].split(".")[1]) for name in node_names if name.startswith("/model.")]
+    head = f"/model.{max(layers)}/"
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.frames = iter(calibration_frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            return None if frame is None else {input_name: preprocess(frame, imgsz)}
+
+    quantize_static(
+        fp32_path,
+        int8_path,
+        FrameReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        nodes_to_exclude=[name for name in node_names if name.startswith(head)]
+    )
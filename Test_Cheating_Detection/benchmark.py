@@ -0,0 +1,229 @@
+"""
+Offline benchmark of the proctoring pipeline:
+extract_frames -> process_directory -> analyze_results, on the bundled sample
+recording, another --video, or a generated one.
+
+    python -m Test_Cheating_Detection.benchmark --save-baseline bench_baseline.json
+    python -m Test_Cheating_Detection.benchmark --baseline bench_baseline.json
+    python -m Test_Cheating_Detection.benchmark --synthetic --duration 60 --width 1280 --height 720 --fps 30
+
+Generated videos contain only moving shapes: YOLO finds no person in them, so
+pose estimation and classification never run and the result check compares
+all-zero counts. Use them for decode/detector throughput only.
+
+Runs on CPU without network access once the YOLO weights are on disk. The
+exit status is 1 when a --baseline comparison finds a regression.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from Test_Cheating_Detection import config
+from Test_Cheating_Detection.metrics import StageTimer
+
+# A stage or frames/sec may drift this much from the baseline before it counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def make_synthetic_video(path, duration=30, width=640, height=480, fps=30, seed=0):
+    """
+    Write a reproducible test video: a noisy background with moving shapes and
+    a scene change every 10 seconds.
+
+    Returns:
+        int: Number of frames written
+    """
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+
+    shapes = [
+        {
+            "pos": rng.uniform([0, 0], [width, height]),
+            "vel": rng.uniform(-4, 4, size=2),
+            "size": int(rng.integers(20, max(21, min(width, height) // 4))),
+            "color": tuple(int(c) for c in rng.integers(0, 256, size=3))
+        }
+        for _ in range(6)
+    ]
+    frames = int(duration * fps)
+    background = None
+    for i in range(frames):
+        if i % int(10 * fps) == 0:
+            background = rng.integers(0, 256, size=3).astype(np.uint8)
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:] = background
+        frame = cv2.add(frame, rng.integers(0, 12, size=frame.shape, dtype=np.uint8))
+        for shape in shapes:
+            shape["pos"] = (shape["pos"] + shape["vel"]) % [width, height]
+            x, y = shape["pos"].astype(int)
+            cv2.rectangle(frame, (x, y), (x + shape["size"], y + shape["size"]), shape["color"], -1)
+        writer.write(frame)
+    writer.release()
+    return frames
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB, None where unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_once(video_path, workdir, interval):
+    """
+    One pass of the pipeline over a video.
+
+    Returns:
+        tuple: (StageTimer summary, result counts)
+    """
+    from Test_Cheating_Detection.detection import analyze_results
+    from Test_Cheating_Detection.frame_analysis import process_directory
+    from Test_Cheating_Detection.generate_pics_from_videos import clear_directory, extract_frames
+
+    frames_dir = os.path.join(workdir, "frames")
+    clear_directory(frames_dir)
+
+    timer = StageTimer()
+    extract_frames(video_path, frames_dir, interval, timer=timer, verbose=False)
+    results = process_directory(frames_dir, timer=timer)
+    with timer.stage("analyze"):
+        analysis = analyze_results(results)
+
+    counts = {
+        "frames": len(results),
+        "phone_frames": len(analysis["phone_usage_frames"]),
+        "multiple_people_frames": len(analysis["multiple_people_frames"]),
+        "people_count_changes": len(analysis["people_count_changes"])
+    }
+    return timer.summary(), counts
+
+
+def benchmark(video_path, workdir, interval, repeats, warmup):
+    """
+    Returns:
+        dict: Median frames/sec over the repeats, per-stage percentiles of the
+              last repeat, result counts and peak RSS
+    """
+    for _ in range(warmup):
+        # Model loading and first-call overheads stay out of the numbers
+        run_once(video_path, workdir, interval)
+
+    runs = [run_once(video_path, workdir, interval) for _ in range(repeats)]
+    summaries = [summary for summary, _ in runs]
+    counts = runs[-1][1]
+    if any(run_counts != counts for _, run_counts in runs):
+        print("Warning: results differ between repeats")
+
+    return {
+        "frames_per_sec": float(np.median([s["frames_per_sec"] for s in summaries])),
+        "wall_sec": float(np.median([s["wall_sec"] for s in summaries])),
+        "stages": summaries[-1]["stages"],
+        "results": counts,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns:
+        list: Human readable regressions, empty when the run is within tolerance
+    """
+    regressions = []
+    if report["config"] != baseline["config"]:
+        print("Warning: benchmark settings differ from the baseline, numbers may not be comparable")
+
+    if report["frames_per_sec"] < baseline["frames_per_sec"] * (1 - tolerance):
+        regressions.append(f"frames/sec {report['frames_per_sec']} < baseline {baseline['frames_per_sec']}")
+    for name, stage in baseline["stages"].items():
+        current = report["stages"].get(name)
+        if current is not None and current["p95_ms"] > stage["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name} p95 {current['p95_ms']}ms > baseline {stage['p95_ms']}ms")
+    if report["peak_rss_mb"] and baseline.get("peak_rss_mb") and report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {report['peak_rss_mb']}MB > baseline {baseline['peak_rss_mb']}MB")
+    # Detection output must not change at all for the same video and settings.
+    # On generated videos these counts are all zero and only cover the detector
+    if report["results"] != baseline["results"]:
+        regressions.append(f"results {report['results']} != baseline {baseline['results']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="benchmark this video instead of the bundled sample recording")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="benchmark a generated video (no people: pose and classification are not exercised)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of generated video")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--interval", type=float, default=2, help="seconds between analyzed frames")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", help="write this run as a baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    if args.video and args.synthetic:
+        parser.error("--video and --synthetic are mutually exclusive")
+    if not args.synthetic and args.video is None:
+        from Test_Cheating_Detection.backends import sample_video
+        args.video = sample_video()
+
+    run_config = {
+        "video": os.path.basename(args.video) if args.video else "synthetic",
+        "duration": args.duration, "width": args.width, "height": args.height, "fps": args.fps, "seed": args.seed,
+        "interval": args.interval,
+        "yolo_variant": config.YOLO_VARIANT,
+        "yolo_imgsz": config.YOLO_IMGSZ,
+        "yolo_batch_size": config.YOLO_BATCH_SIZE,
+        "detector_backend": config.DETECTOR_BACKEND,
+        "pose_backend": config.POSE_BACKEND
+    }
+    if args.video:
+        for key in ("duration", "width", "height", "fps", "seed"):
+            run_config.pop(key)
+
+    with tempfile.TemporaryDirectory(prefix="proctor-bench-") as workdir:
+        video_path = args.video
+        if video_path is None:
+            video_path = os.path.join(workdir, "synthetic.mp4")
+            make_synthetic_video(video_path, args.duration, args.width, args.height, args.fps, args.seed)
+            print("Note: the generated video has no people, pose and classification are not exercised")
+        report = dict(config=run_config, **benchmark(video_path, workdir, args.interval, args.repeats, args.warmup))
+
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
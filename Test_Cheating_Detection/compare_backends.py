@@ -0,0 +1,92 @@
+"""
+Accuracy / throughput of the detector backends against the PyTorch path, on a
+fixed set of frames from the bundled sample video.
+
+    python -m Test_Cheating_Detection.compare_backends --variant l --backends torch,onnx,onnx-int8
+"""
+import argparse
+import json
+import time
+
+from Test_Cheating_Detection.backends import sample_frames
+from Test_Cheating_Detection.config import DETECTOR_BACKENDS, YOLO_BATCH_SIZE, YOLO_IMGSZ, YOLO_VARIANT
+from Test_Cheating_Detection.frame_analysis import detect_batch
+from Test_Cheating_Detection.tracking import iou_matrix
+
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """
+    How closely a backend's detections match the reference ones.
+
+    Returns:
+        dict: Share of frames with the same people count / device flag, and the
+              share of reference boxes found again (same class, IoU >= threshold)
+    """
+    same_people = same_device = matched = total = 0
+    for ref, cand in zip(reference, candidate):
+        same_people += ref["people_count"] == cand["people_count"]
+        same_device += ref["communication_device_present"] == cand["communication_device_present"]
+        iou = iou_matrix(ref["boxes"], cand["boxes"])
+        for i, cls in enumerate(ref["classes"]):
+            total += 1
+            same_class = [j for j, c in enumerate(cand["classes"]) if c == cls]
+            matched += bool(same_class) and iou[i, same_class].max() >= iou_threshold
+    frames = max(1, len(reference))
+    return {
+        "people_count_agreement": round(same_people / frames, 4),
+        "device_agreement": round(same_device / frames, 4),
+        "box_recall": round(matched / total, 4) if total else 1.0
+    }
+
+
+def benchmark_backend(frames, variant, backend, batch_size, repeats):
+    """
+    Returns:
+        tuple: (detections, frames per second over `repeats` timed passes)
+    """
+    # First pass loads (and if needed exports) the model; it is not timed
+    detections = detect_batch(frames, batch_size, variant=variant, backend=backend)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        detect_batch(frames, batch_size, variant=variant, backend=backend)
+    elapsed = time.perf_counter() - start
+    return detections, len(frames) * repeats / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variant", default=YOLO_VARIANT)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8", help=f"comma-separated, from {', '.join(DETECTOR_BACKENDS)}")
+    parser.add_argument("--frames", type=int, default=32, help="sample frames, one per second of the sample video")
+    parser.add_argument("--batch-size", type=int, default=YOLO_BATCH_SIZE)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    # PyTorch is the reference every other backend is compared against
+    backends = ["torch"] + [b for b in args.backends.split(",") if b != "torch"]
+
+    frames = sample_frames(args.frames)
+    print(f"{len(frames)} sample frames, yolov8{args.variant}, imgsz {YOLO_IMGSZ}, batch {args.batch_size}")
+
+    report = {}
+    reference = None
+    for backend in backends:
+        detections, fps = benchmark_backend(frames, args.variant, backend, args.batch_size, args.repeats)
+        if reference is None:
+            reference = detections
+        report[backend] = {"frames_per_sec": round(fps, 2), **agreement(reference, detections)}
+        report[backend]["speedup"] = round(fps / report["torch"]["frames_per_sec"], 2)
+
+    print(f"{'backend':<15}{'fps':>10}{'speedup':>10}{'people':>10}{'device':>10}{'recall':>10}")
+    for backend, row in report.items():
+        print(f"{backend:<15}{row['frames_per_sec']:>10}{row['speedup']:>10}"
+              f"{row['people_count_agreement']:>10}{row['device_agreement']:>10}{row['box_recall']:>10}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
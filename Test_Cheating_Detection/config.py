@@ -0,0 +1,83 @@
+import os
+
+# Settings of the proctoring pipeline. Kept free of model imports so the API
+# process can read them (e.g. for cache keys) without loading YOLO or Pose.
+
+# Bump when a change to the analysis code changes results for the same settings
+ANALYSIS_VERSION = 3
+
+# Frames are only shown in an OpenCV window when explicitly enabled; servers run headless
+DISPLAY_FRAMES = os.getenv("PROCTOR_DISPLAY", "0") == "1"
+
+# Detector settings, overridable per deployment through the environment
+YOLO_VARIANT = os.getenv("PROCTOR_YOLO_VARIANT", "l")  # n / s / m / l
+YOLO_IMGSZ = int(os.getenv("PROCTOR_YOLO_IMGSZ", "640"))
+YOLO_BATCH_SIZE = int(os.getenv("PROCTOR_YOLO_BATCH_SIZE", "8"))
+
+# Inference runtime of the detector: PyTorch, or an exported ONNX Runtime /
+# OpenVINO copy (optionally int8), kept in MODEL_DIR
+DETECTOR_BACKENDS = ("torch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+DETECTOR_BACKEND = os.getenv("PROCTOR_DETECTOR_BACKEND", "torch")
+MODEL_DIR = os.getenv("PROCTOR_MODEL_DIR", "models")
+if DETECTOR_BACKEND not in DETECTOR_BACKENDS:
+    raise ValueError(f"Unsupported detector backend: {DETECTOR_BACKEND}")
+
+# Head orientation backend: "mediapipe" (full frame), "mediapipe-roi"
+# (person crop only) or "yolo-pose" (batched YOLOv8-pose keypoints)
+POSE_BACKEND = os.getenv("PROCTOR_POSE_BACKEND", "mediapipe")
+POSE_VARIANT = os.getenv("PROCTOR_POSE_VARIANT", "n")
+POSE_INPUT_SIZE = 256  # MediaPipe Pose landmark model input
+ROI_PADDING = 0.1
+KEYPOINT_MIN_CONFIDENCE = 0.5
+if POSE_BACKEND not in ("mediapipe", "mediapipe-roi", "yolo-pose"):
+    raise ValueError(f"Unsupported pose backend: {POSE_BACKEND}")
+
+# Tracking: the detector only runs on every DETECT_EVERY-th sampled frame and
+# people / devices are counted from confirmed tracks, so a single missed
+# detection no longer registers as a change
+TRACKING = os.getenv("PROCTOR_TRACKING", "0") == "1"
+DETECT_EVERY = int(os.getenv("PROCTOR_DETECT_EVERY", "3"))
+
+# Head turned away once the nose is this fraction of the eye distance off-centre
+DIRECTION_THRESHOLD = 0.2
+
+# Only the classes classify_frame actually reads are detected
+DEVICE_CLASSES = ["laptop", "remote", "cell phone", "tv"]
+DETECTION_CLASSES = ["person"] + DEVICE_CLASSES
+DETECTION_MIN_CONFIDENCE = 0.25
+
+# Raw detections of these classes are recorded for re-scoring; a policy can
+# only use classes that were recorded. "all" keeps every COCO class.
+RECORDED_CLASSES = os.getenv("PROCTOR_RECORDED_CLASSES", ",".join(DETECTION_CLASSES))
+RECORDED_CLASSES = None if RECORDED_CLASSES == "all" else sorted(set(RECORDED_CLASSES.split(",")) | set(DETECTION_CLASSES))
+# Recorded detections are kept here, one .npz per analyzed video
+RECORDINGS_DIR = os.getenv("PROCTOR_RECORDINGS_DIR", "recordings")
+# Least recently used recordings are removed once the directory grows past this
+RECORDINGS_MAX_BYTES = int(os.getenv("PROCTOR_RECORDINGS_MAX_BYTES", str(1024 ** 3)))
+
+
+def analysis_params(interval, adaptive):
+    """
+    Everything besides the video itself that changes a proctoring result.
+
+    Returns:
+        dict: JSON-serializable parameters, used as part of the result cache key
+    """
+    return {
+        "version": ANALYSIS_VERSION,
+        "interval": interval,
+        "adaptive": adaptive,
+        "yolo_variant": YOLO_VARIANT,
+        "yolo_imgsz": YOLO_IMGSZ,
+        "detector_backend": DETECTOR_BACKEND,
+        "tracking": TRACKING,
+        "detect_every": DETECT_EVERY if TRACKING else 1,
+        "pose_backend": POSE_BACKEND,
+        "pose_variant": POSE_VARIANT,
+        "roi_padding": ROI_PADDING,
+        "keypoint_min_confidence": KEYPOINT_MIN_CONFIDENCE,
+        "direction_threshold": DIRECTION_THRESHOLD,
+        "min_confidence": DETECTION_MIN_CONFIDENCE,
+        "classes": DETECTION_CLASSES,
+        "recorded_classes": RECORDED_CLASSES or "all"
+    }
@@ -1,102 +1,120 @@
-from Test_Cheating_Detection.frame_analysis import process_directory
+from Test_Cheating_Detection.frame_analysis import process_directory, process_frames, classNames
+from Test_Cheating_Detection.generate_pics_from_videos import iter_frames, iter_adaptive_frames
+from Test_Cheating_Detection.sampling import AdaptiveSampler
+from Test_Cheating_Detection.metrics import StageTimer
+from Test_Cheating_Detection.tracking import Tracker
+from Test_Cheating_Detection.config import TRACKING, DETECT_EVERY, RECORDED_CLASSES
+from Test_Cheating_Detection.timeline import FrameTable, summarize, candidate_report
 import os
 
+# Small batches keep incident feedback to the adaptive sampler prompt
+ADAPTIVE_BATCH_SIZE = int(os.getenv("PROCTOR_ADAPTIVE_BATCH_SIZE", "2"))
+
 # New function to process a specific candidate's content
-def process_candidate_exam(candidate_name):
-    # Create content path based on candidate name
+def process_candidate_exam(candidate_name, frames_dir=None):
+    # Create content path based on candidate name, unless the frames live in a job workspace
     path = "Test_Cheating_Detection\\frames" if os.name == "nt" else "Test_Cheating_Detection/frames"
-    content_path = os.path.join(path, candidate_name)
+    content_path = frames_dir or os.path.join(path, candidate_name)
     print(f"Processing content for candidate: {candidate_name} at {content_path}")
     # Process the directory
-    result = process_directory(content_path)
-    
-    # Analyze the results
-    analysis = analyze_results(result)
-    
-    # Extract just the filenames for phone usage frames
-    phone_frames = [os.path.basename(frame) for frame in analysis["phone_usage_frames"]]
-    
-    # Extract just the filenames for frames with multiple people
-    multiple_people_frames = [os.path.basename(frame) for frame in analysis["multiple_people_frames"]]
-    
-    # Format the output in the exact format requested
-    formatted_result = {
-        "Candidate": candidate_name,
-        "Phone usage detected": len(phone_frames),
-        "Frames with phone detection": phone_frames if phone_frames else [],
-        "People detected (more than 1)": len(multiple_people_frames),
-        "Frames with multiple people detection": multiple_people_frames if multiple_people_frames else [],
-        "People count changes detected": len(analysis["people_count_changes"]),
-        "Total frames processed": len(result)
-    }
+    timer = StageTimer()
+    result = process_directory(content_path, timer=timer)
     
+    formatted_result = format_candidate_result(candidate_name, result)
+    formatted_result["Timings"] = timer.summary()
     return formatted_result
 
+# Process a candidate's video directly, streaming decoded frames into detection
+def process_candidate_video(candidate_name, video_path, interval=2, mode="grab", adaptive=False, recording_path=None):
+    print(f"Streaming video for candidate: {candidate_name} from {video_path}")
+    timer = StageTimer()
+    # Optional tracking: fewer detector passes, and people / devices that
+    # appear or disappear are reported as track events
+    tracker = Tracker() if TRACKING else None
+    if not adaptive:
+        result = process_frames(iter_frames(video_path, interval, mode, timer), timer=timer, tracker=tracker, detect_every=DETECT_EVERY)
+        formatted_result = format_candidate_result(candidate_name, result, recording_path)
+    else:
+        # Skip near-duplicate frames and sample densely around incidents
+        sampler = AdaptiveSampler(interval=interval)
+        result = process_frames(
+            iter_adaptive_frames(video_path, sampler, timer),
+            batch_size=ADAPTIVE_BATCH_SIZE,
+            on_result=sampler.observe,
+            timer=timer,
+            tracker=tracker,
+            detect_every=DETECT_EVERY
+        )
+        formatted_result = format_candidate_result(candidate_name, result, recording_path)
+        formatted_result["Frames skipped as static"] = sampler.stats()["skipped_static"]
+
+    if tracker is not None:
+        formatted_result["Track events"] = tracker.events
+        formatted_result["Detector passes"] = tracker.updates
+    formatted_result["Timings"] = timer.summary()
+    return formatted_result
+
+def format_candidate_result(candidate_name, result, recording_path=None):
+    # Per-frame results go into a columnar table, everything below is vectorized
+    recorded_classes = RECORDED_CLASSES if RECORDED_CLASSES is not None else list(classNames.values())
+    table = FrameTable.from_results(result, recorded_classes)
+    if recording_path is not None:
+        # Raw detections, so the result can be re-scored later without the models
+        table.save(recording_path)
+    summary = summarize(table)
+    print_summary(table, summary)
+    return candidate_report(candidate_name, table, summary)
+
+def print_summary(table, summary):
+    """
+    Log the flagged frame counts of summarize(table).
+    """
+    print(f"Results analysis:")
+    print(f"Total frames processed: {len(table)}")
+    print(f"Phone detected in {int(summary['phone_usage'].sum())} frames, {len(summary['timeline']['phone'])} intervals")
+    print(f"More than one person in {int(summary['multiple_people'].sum())} frames, {len(summary['timeline']['multiple_people'])} intervals")
+    print(f"People count changed {len(summary['people_count_changes'])} times")
+    print(f"Unique people counts observed: {summary['unique_people_counts']}")
+
 # Process results to detect phone usage and people count changes
 def analyze_results(results):
-    phone_usage_frames = []
-    multiple_people_frames = []  # Changed to track frames with multiple people
-    people_count_changes = []
-    previous_count = None
-    unique_people_counts = set()
-    
-    for i, frame in enumerate(results):
-        # Check for phone usage
-        if frame['communication_device_present']:
-            phone_usage_frames.append(frame['image_path'])
-        
-        # Track frames with multiple people detected (more than 1)
-        if frame['people_count'] > 1:
-            multiple_people_frames.append(frame['image_path'])
-        
-        # Track unique people counts
-        unique_people_counts.add(frame['people_count'])
-        
-        # Check for people count changes
-        current_count = frame['people_count']
-        if previous_count is not None and current_count != previous_count:
-            people_count_changes.append({
-                'frame': frame['image_path'],
-                'previous_count': previous_count,
-                'current_count': current_count
-            })
-        previous_count = current_count
-    
-    # Summary
-    print(f"Results analysis:")
-    print(f"Total frames processed: {len(results)}")
-    
-    # Phone usage summary
-    print(f"\nPhone detection summary:")
-    if phone_usage_frames:
-        print(f"Phone detected in {len(phone_usage_frames)} frames:")
-        for frame in phone_usage_frames:
-            print(f"  - {frame}")
-    else:
-        print("No phone usage detected in any frames.")
-    
-    # People count changes summary
-    print(f"\nPeople count changes summary:")
-    if people_count_changes:
-        print(f"People count changed {len(people_count_changes)} times:")
-        for change in people_count_changes:
-            print(f"  - In {change['frame']}: {change['previous_count']} → {change['current_count']}")
-    else:
-        print("No changes in people count detected.")
-    
-    print(f"\nUnique people counts observed: {sorted(list(unique_people_counts))}")
-    
+    """
+    Args:
+        results (FrameTable or list): Per-frame detection results
+
+    Returns:
+        dict: Flagged frame labels, people count changes, unique counts and the incident timeline
+    """
+    table = results if isinstance(results, FrameTable) else FrameTable.from_results(results)
+    summary = summarize(table)
+    print_summary(table, summary)
+
     return {
-        "phone_usage_frames": phone_usage_frames,
-        "multiple_people_frames": multiple_people_frames,  # Updated name
-        "people_count_changes": people_count_changes,
-        "unique_people_counts": sorted(list(unique_people_counts))
+        "phone_usage_frames": table.labels[summary["phone_usage"]].tolist(),
+        "multiple_people_frames": table.labels[summary["multiple_people"]].tolist(),
+        "people_count_changes": summary["people_count_changes"],
+        "unique_people_counts": summary["unique_people_counts"],
+        "timeline": summary["timeline"]
     }
 
 # Example usage
 if __name__ == "__main__":
-    # Process a specific candidate
-    candidate_result = process_candidate_exam("karim")
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Run the proctoring analysis for one candidate.")
+    parser.add_argument("candidate")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--video", help="analyze this video directly")
+    source.add_argument("--frames-dir", help="analyze previously extracted frames (default: Test_Cheating_Detection/frames/<candidate>)")
+    parser.add_argument("--interval", type=float, default=2)
+    parser.add_argument("--adaptive", action="store_true")
+    args = parser.parse_args()
+
+    if args.video:
+        candidate_result = process_candidate_video(args.candidate, args.video, args.interval, adaptive=args.adaptive)
+    else:
+        candidate_result = process_candidate_exam(args.candidate, args.frames_dir)
     
     # Option 1: Print as formatted text
     print(f"Candidate: {candidate_result['Candidate']}")
@@ -116,6 +134,5 @@ if __name__ == "__main__":
     print(f"Total frames processed: {candidate_result['Total frames processed']}")
     
     # Option 2: Return as JSON
-    import json
     print("\n==== JSON Output ====")
-    print(json.dumps(candidate_result, indent=2))
\ No newline at end of file
+    print(json.dumps(candidate_result, indent=2))
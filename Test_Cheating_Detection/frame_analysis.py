@@ -4,89 +4,393 @@ import json
 import math
 from ultralytics import YOLO
 import mediapipe as mp
+from Test_Cheating_Detection.metrics import timed
+from Test_Cheating_Detection.config import (
+    DISPLAY_FRAMES, YOLO_VARIANT, YOLO_IMGSZ, YOLO_BATCH_SIZE, POSE_BACKEND, POSE_VARIANT,
+    POSE_INPUT_SIZE, ROI_PADDING, KEYPOINT_MIN_CONFIDENCE, DIRECTION_THRESHOLD, DEVICE_CLASSES,
+    DETECTION_MIN_CONFIDENCE, RECORDED_CLASSES, DETECTOR_BACKEND
+)
+from Test_Cheating_Detection.backends import ensure_model
 
-model = YOLO("yolov8l.pt")
+_detectors = {}
+
+def get_detector(variant=YOLO_VARIANT, backend=DETECTOR_BACKEND, imgsz=YOLO_IMGSZ):
+    """
+    Load a YOLOv8 detector once per variant, backend and input size and reuse it afterwards.
+
+    Args:
+        variant (str): Model size, one of "n", "s", "m" or "l"
+        backend (str): One of DETECTOR_BACKENDS; exported models are created on first use
+        imgsz (int): Inference resolution; exported models are fixed to the size they were exported at
+
+    Returns:
+        YOLO: The loaded model, with the same predict() API for every backend
+    """
+    if variant not in ("n", "s", "m", "l"):
+        raise ValueError(f"Unsupported YOLO variant: {variant}")
+    # The .pt weights run at any size, so "torch" needs only one copy
+    key = (variant, backend, None if backend == "torch" else imgsz)
+    if key not in _detectors:
+        _detectors[key] = YOLO(ensure_model(variant, backend, imgsz), task="detect")
+    return _detectors[key]
+
+_pose_models = {}
+
+def get_pose_model(variant=POSE_VARIANT):
+    """
+    Load a YOLOv8-pose model once per variant and reuse it afterwards.
+    """
+    if variant not in ("n", "s", "m", "l"):
+        raise ValueError(f"Unsupported YOLO pose variant: {variant}")
+    if variant not in _pose_models:
+        _pose_models[variant] = YOLO(f"yolov8{variant}-pose.pt")
+    return _pose_models[variant]
+
+model = get_detector()
 classNames = model.names
 mp_pose = mp.solutions.pose
 pose = mp_pose.Pose(static_image_mode=True)
 
+def detect_batch(frames, batch_size=None, imgsz=None, variant=None, backend=None):
+    """
+    Run the detector over a list of frames, batch_size frames per forward pass.
+
+    Args:
+        frames (list): BGR frames as numpy arrays
+        batch_size (int): Frames per inference call, defaults to YOLO_BATCH_SIZE
+        imgsz (int): Inference resolution, defaults to YOLO_IMGSZ
+        variant (str): Model size, defaults to YOLO_VARIANT
+        backend (str): Inference runtime, defaults to DETECTOR_BACKEND
+
+    Returns:
+        list: One dict per frame with people_count, communication_device_present
+              and the raw boxes, class names and confidences of RECORDED_CLASSES
+    """
+    imgsz = imgsz or YOLO_IMGSZ
+    detector = get_detector(variant or YOLO_VARIANT, backend or DETECTOR_BACKEND, imgsz)
+    names = detector.names
+    # Extra recorded classes only feed re-scoring; NMS is per class, so they
+    # do not change the person and device detections
+    class_ids = None if RECORDED_CLASSES is None else [i for i, name in names.items() if name in RECORDED_CLASSES]
+    batch_size = batch_size or YOLO_BATCH_SIZE
+
+    detections = []
+    for start in range(0, len(frames), batch_size):
+        batch = frames[start:start + batch_size]
+        results = detector.predict(batch, imgsz=imgsz, classes=class_ids, conf=DETECTION_MIN_CONFIDENCE, verbose=False)
+
+        for result in results:
+            boxes = result.boxes.xyxy.tolist()
+            classes = [names[int(c)] for c in result.boxes.cls.tolist()]
+            confidences = result.boxes.conf.tolist()
+
+            detections.append({
+                "people_count": classes.count("person"),
+                "communication_device_present": any(c in DEVICE_CLASSES for c in classes),
+                "boxes": boxes,
+                "classes": classes,
+                "confidences": confidences
+            })
+
+    return detections
+
 def classify_image(image_path):
     image = cv2.imread(image_path)
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    output = classify_frame(image, image_path)
 
-    results = model(image)
+    if DISPLAY_FRAMES:
+        cv2.imshow("name", image)
+        cv2.waitKey(1)  # Add small delay to show image
 
-    people_count = 0
-    communication_device_present = False
+    return output  # Return dictionary instead of JSON string
 
-    for box in results[0].boxes:
-        cls = int(box.cls[0])
-        detected_class = classNames[cls]
+def classify_frame(image, image_path=None):
+    """
+    Run detection and head-orientation analysis on an already decoded frame.
 
-        if detected_class == "person":
-            people_count += 1
-        elif detected_class in ["laptop", "remote", "cell phone", "tvmonitor"]:
-            communication_device_present = True
+    Args:
+        image (numpy.ndarray): BGR frame as returned by OpenCV
+        image_path (str): Label reported back as "image_path" in the result
 
-    direction_looking = "at-system"
+    Returns:
+        dict: Detection result for the frame
+    """
+    return classify_frames([image], [image_path])[0]
+
+def classify_frames(images, image_paths=None, batch_size=None, timer=None):
+    """
+    Batched counterpart of classify_frame.
+
+    Args:
+        images (list): BGR frames as numpy arrays
+        image_paths (list): Labels reported back as "image_path", one per frame
+        batch_size (int): Frames per detector call, defaults to YOLO_BATCH_SIZE
+        timer (StageTimer): Receives "yolo" and "pose" timings
+
+    Returns:
+        list: Detection results, in the same order as images
+    """
+    if image_paths is None:
+        image_paths = [None] * len(images)
+
+    with timed(timer, "yolo"):
+        detections = detect_batch(images, batch_size)
 
-    if people_count == 1:
-        pose_result = pose.process(image_rgb)
+    # Head orientation is only estimated when exactly one person is in frame
+    single = [i for i, detection in enumerate(detections) if detection["people_count"] == 1]
+    keypoints = {}
+    if single:
+        with timed(timer, "pose"):
+            keypoints = dict(zip(single, estimate_keypoints(
+                [images[i] for i in single],
+                [detections[i]["boxes"][detections[i]["classes"].index("person")] for i in single]
+            )))
 
-        if pose_result.pose_landmarks:
-            nose = pose_result.pose_landmarks.landmark[mp_pose.PoseLandmark.NOSE]
-            left_eye = pose_result.pose_landmarks.landmark[mp_pose.PoseLandmark.LEFT_EYE]
-            right_eye = pose_result.pose_landmarks.landmark[mp_pose.PoseLandmark.RIGHT_EYE]
+    outputs = []
+    for i, (image_path, detection) in enumerate(zip(image_paths, detections)):
+        direction_looking = "at-system"
+        if keypoints.get(i) is not None:
+            direction_looking = direction_from_keypoints(*keypoints[i])
 
-            h, w, _ = image.shape
-            nose_coords = (int(nose.x * w), int(nose.y * h))
-            left_eye_coords = (int(left_eye.x * w), int(left_eye.y * h))
-            right_eye_coords = (int(right_eye.x * w), int(right_eye.y * h))
+        outputs.append({
+            "people_count": detection["people_count"],
+            "direction-looking": direction_looking,
+            "communication_device_present": detection["communication_device_present"],
+            "image_path": image_path,
+            # Raw model output, kept so results can be re-scored without re-running the models
+            "detections": {
+                "boxes": detection["boxes"],
+                "classes": detection["classes"],
+                "confidences": detection["confidences"]
+            },
+            "keypoints": keypoints.get(i)
+        })
 
-            # Optionally visualize the points with colored dots
-            # cv2.circle(image, nose_coords, 5, (0, 0, 255), -1)  # Red for nose
-            # cv2.circle(image, left_eye_coords, 5, (0, 255, 0), -1)  # Green for left eye
-            # cv2.circle(image, right_eye_coords, 5, (255, 0, 0), -1)  # Blue for right eye
+    return outputs
 
-            mid_eye_x = (left_eye_coords[0] + right_eye_coords[0]) / 2
-            mid_eye_y = (left_eye_coords[1] + right_eye_coords[1]) / 2
-            dist_nose_mid_eye_x = abs(nose_coords[0] - mid_eye_x)
-            dist_nose_mid_eye_y = abs(nose_coords[1] - mid_eye_y)
-            dist_between_eyes = math.sqrt((right_eye_coords[0] - left_eye_coords[0])**2 + (right_eye_coords[1] - left_eye_coords[1])**2)
+def classify_tracked_frames(images, image_paths, timestamps, detect_flags, tracker, batch_size=None, timer=None):
+    """
+    classify_frames with a tracker in front: the detector only runs on the
+    frames flagged in detect_flags, tracks are propagated over the others, and
+    people / devices are counted from confirmed tracks.
 
-            screen_threshold_x = dist_between_eyes * 0.2
-            screen_threshold_y = dist_between_eyes * 0.2
+    Args:
+        images (list): BGR frames as numpy arrays, in video order
+        image_paths (list): Labels reported back as "image_path", one per frame
+        timestamps (list): Seconds into the video, one per frame
+        detect_flags (list): True for frames that get a detector pass
+        tracker (tracking.Tracker): Tracker carried over from the previous batch
+        batch_size (int): Frames per detector call, defaults to YOLO_BATCH_SIZE
+        timer (StageTimer): Receives "yolo", "track" and "pose" timings
+
+    Returns:
+        list: Detection results, in the same order as images; "detections"
+              holds the tracked boxes, with each track's last matched confidence
+    """
+    detect_indices = [i for i, flag in enumerate(detect_flags) if flag]
+    detections = {}
+    if detect_indices:
+        with timed(timer, "yolo"):
+            detections = dict(zip(detect_indices, detect_batch([images[i] for i in detect_indices], batch_size)))
 
-            if dist_nose_mid_eye_x < screen_threshold_x and dist_nose_mid_eye_y < screen_threshold_y:
-                direction_looking = "at-system"
+    tracked = []
+    with timed(timer, "track"):
+        for i, timestamp in enumerate(timestamps):
+            if i in detections:
+                detection = detections[i]
+                tracks = tracker.update(detection["boxes"], detection["classes"], detection["confidences"], timestamp)
             else:
-                if nose_coords[1] < mid_eye_y and nose_coords[0] < mid_eye_x:
-                    direction_looking = "up-left"
-                elif nose_coords[1] < mid_eye_y and nose_coords[0] > mid_eye_x:
-                    direction_looking = "up-right"
-                elif nose_coords[1] > mid_eye_y and nose_coords[0] < mid_eye_x:
-                    direction_looking = "down-left"
-                elif nose_coords[1] > mid_eye_y and nose_coords[0] > mid_eye_x:
-                    direction_looking = "down-right"
-
-    output = {
-        "people_count": people_count,
-        "direction-looking": direction_looking,
-        "communication_device_present": communication_device_present,
-        "image_path": image_path
-    }
-    
-    cv2.imshow("name", image)
-    cv2.waitKey(1)  # Add small delay to show image
+                tracks = tracker.predict(timestamp)
+            tracked.append([(track.cls, track.box.tolist(), track.score) for track in tracks])
 
-    return output  # Return dictionary instead of JSON string
+    person_boxes = [[box for cls, box, _ in tracks if cls == "person"] for tracks in tracked]
+    single = [i for i, boxes in enumerate(person_boxes) if len(boxes) == 1]
+    keypoints = {}
+    if single:
+        with timed(timer, "pose"):
+            keypoints = dict(zip(single, estimate_keypoints([images[i] for i in single], [person_boxes[i][0] for i in single])))
+
+    outputs = []
+    for i, (image_path, tracks) in enumerate(zip(image_paths, tracked)):
+        direction_looking = "at-system"
+        if keypoints.get(i) is not None:
+            direction_looking = direction_from_keypoints(*keypoints[i])
+
+        outputs.append({
+            "people_count": len(person_boxes[i]),
+            "direction-looking": direction_looking,
+            "communication_device_present": any(cls in DEVICE_CLASSES for cls, _, _ in tracks),
+            "image_path": image_path,
+            "detections": {
+                "boxes": [box for _, box, _ in tracks],
+                "classes": [cls for cls, _, _ in tracks],
+                "confidences": [score for _, _, score in tracks]
+            },
+            "keypoints": keypoints.get(i),
+            "detector_pass": i in detections
+        })
+
+    return outputs
+
+def estimate_keypoints(images, person_boxes):
+    """
+    Locate nose and eyes of the single candidate in each frame with the
+    configured POSE_BACKEND.
+
+    Args:
+        images (list): BGR frames as numpy arrays
+        person_boxes (list): The candidate's [x1, y1, x2, y2] box in each frame
+
+    Returns:
+        list: (nose, left_eye, right_eye) pixel coordinates per frame, or None
+              where no pose was found
+    """
+    if POSE_BACKEND == "yolo-pose":
+        return pose_keypoints_yolo(images)
+    if POSE_BACKEND == "mediapipe-roi":
+        return [pose_keypoints_roi(image, box) for image, box in zip(images, person_boxes)]
+    return [pose_keypoints(image) for image in images]
+
+def _pose_landmarks(image):
+    """
+    Nose, left eye and right eye from MediaPipe Pose, as float pixel coordinates.
+    """
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    pose_result = pose.process(image_rgb)
+
+    if not pose_result.pose_landmarks:
+        return None
+
+    landmarks = pose_result.pose_landmarks.landmark
+    h, w, _ = image.shape
+    return tuple(
+        (landmarks[point].x * w, landmarks[point].y * h)
+        for point in (mp_pose.PoseLandmark.NOSE, mp_pose.PoseLandmark.LEFT_EYE, mp_pose.PoseLandmark.RIGHT_EYE)
+    )
 
-def process_directory(directory_path):
+def pose_keypoints(image):
+    """
+    MediaPipe Pose on the full-resolution frame.
+    """
+    keypoints = _pose_landmarks(image)
+    if keypoints is None:
+        return None
+    return tuple((int(x), int(y)) for x, y in keypoints)
+
+def pose_keypoints_roi(image, box):
+    """
+    MediaPipe Pose on the person's bounding box only, downscaled to the
+    pose model's input size. Keypoints are mapped back to frame coordinates.
+    """
+    h, w, _ = image.shape
+    x1, y1, x2, y2 = box
+    pad_x = (x2 - x1) * ROI_PADDING
+    pad_y = (y2 - y1) * ROI_PADDING
+    x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+    x2, y2 = min(w, int(x2 + pad_x)), min(h, int(y2 + pad_y))
+    if x2 <= x1 or y2 <= y1:
+        return None
+
+    crop = image[y1:y2, x1:x2]
+    scale = min(1.0, POSE_INPUT_SIZE / max(crop.shape[:2]))
+    if scale < 1.0:
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # Rounded only in frame coordinates: rounding in the downscaled crop
+    # would quantize keypoints to 1 / scale pixels
+    keypoints = _pose_landmarks(crop)
+    if keypoints is None:
+        return None
+    return tuple((int(round(x1 + x / scale)), int(round(y1 + y / scale))) for x, y in keypoints)
+
+def pose_keypoints_yolo(images):
+    """
+    Nose and eye keypoints from a batched YOLOv8-pose pass (COCO keypoint
+    order: 0 nose, 1 left eye, 2 right eye), taken from the most confident
+    person in each frame.
+    """
+    if not images:
+        return []
+
+    results = get_pose_model().predict(images, imgsz=YOLO_IMGSZ, verbose=False)
+
+    keypoints = []
+    for result in results:
+        if result.keypoints is None or len(result.boxes) == 0:
+            keypoints.append(None)
+            continue
+
+        best = int(result.boxes.conf.argmax())
+        points = result.keypoints.xy[best][:3].tolist()
+        confidences = result.keypoints.conf[best][:3].tolist() if result.keypoints.conf is not None else [1.0] * 3
+
+        if min(confidences) < KEYPOINT_MIN_CONFIDENCE:
+            keypoints.append(None)
+        else:
+            keypoints.append(tuple((int(x), int(y)) for x, y in points))
+
+    return keypoints
+
+def estimate_direction(image):
+    """
+    Classify where a single candidate is looking from MediaPipe pose landmarks.
+
+    Args:
+        image (numpy.ndarray): BGR frame containing exactly one person
+
+    Returns:
+        str: "at-system", "up-left", "up-right", "down-left" or "down-right"
+    """
+    keypoints = pose_keypoints(image)
+    if keypoints is None:
+        return "at-system"
+    return direction_from_keypoints(*keypoints)
+
+def direction_from_keypoints(nose_coords, left_eye_coords, right_eye_coords):
+    """
+    Classify head orientation from nose and eye pixel coordinates.
+
+    Returns:
+        str: "at-system", "up-left", "up-right", "down-left" or "down-right"
+    """
+    direction_looking = "at-system"
+
+    # Optionally visualize the points with colored dots
+    # cv2.circle(image, nose_coords, 5, (0, 0, 255), -1)  # Red for nose
+    # cv2.circle(image, left_eye_coords, 5, (0, 255, 0), -1)  # Green for left eye
+    # cv2.circle(image, right_eye_coords, 5, (255, 0, 0), -1)  # Blue for right eye
+
+    mid_eye_x = (left_eye_coords[0] + right_eye_coords[0]) / 2
+    mid_eye_y = (left_eye_coords[1] + right_eye_coords[1]) / 2
+    dist_nose_mid_eye_x = abs(nose_coords[0] - mid_eye_x)
+    dist_nose_mid_eye_y = abs(nose_coords[1] - mid_eye_y)
+    dist_between_eyes = math.sqrt((right_eye_coords[0] - left_eye_coords[0])**2 + (right_eye_coords[1] - left_eye_coords[1])**2)
+
+    screen_threshold_x = dist_between_eyes * DIRECTION_THRESHOLD
+    screen_threshold_y = dist_between_eyes * DIRECTION_THRESHOLD
+
+    if dist_nose_mid_eye_x < screen_threshold_x and dist_nose_mid_eye_y < screen_threshold_y:
+        direction_looking = "at-system"
+    else:
+        if nose_coords[1] < mid_eye_y and nose_coords[0] < mid_eye_x:
+            direction_looking = "up-left"
+        elif nose_coords[1] < mid_eye_y and nose_coords[0] > mid_eye_x:
+            direction_looking = "up-right"
+        elif nose_coords[1] > mid_eye_y and nose_coords[0] < mid_eye_x:
+            direction_looking = "down-left"
+        elif nose_coords[1] > mid_eye_y and nose_coords[0] > mid_eye_x:
+            direction_looking = "down-right"
+
+    return direction_looking
+
+def process_directory(directory_path, batch_size=None, timer=None):
     """
     Process all images in a directory and return a list of JSON results
     
     Args:
         directory_path (str): Path to directory containing images
+        batch_size (int): Images per detector call, defaults to YOLO_BATCH_SIZE
+        timer (StageTimer): Receives "image_read", "yolo" and "pose" timings
         
     Returns:
         list: List of JSON objects with detection results for each image
@@ -96,26 +400,98 @@ def process_directory(directory_path):
     if not os.path.exists(directory_path):
         return results_list
     
-    images = os.listdir(directory_path)
+    # Sorted so that frames are analyzed in the order they were extracted
+    img_paths = [
+        os.path.join(directory_path, img_name)
+        for img_name in sorted(os.listdir(directory_path))
+        if img_name.lower().endswith((".jpg", ".jpeg", ".png"))
+    ]
+    batch_size = batch_size or YOLO_BATCH_SIZE
+    
+    for start in range(0, len(img_paths), batch_size):
+        batch_paths = img_paths[start:start + batch_size]
+        images = []
+        for img_path in batch_paths:
+            # Kept apart from the video "decode" stage of extract_frames
+            with timed(timer, "image_read"):
+                images.append(cv2.imread(img_path))
+        
+        results_list.extend(classify_frames(images, batch_paths, batch_size, timer))
+        
+        if DISPLAY_FRAMES:
+            for image in images:
+                cv2.imshow("name", image)
+                cv2.waitKey(1)
+    
+    if timer is not None:
+        timer.add_frames(len(results_list))
+    if DISPLAY_FRAMES:
+        cv2.destroyAllWindows()  # Close any open windows when done
+    return results_list
+
+def process_frames(frames, batch_size=None, on_result=None, timer=None, tracker=None, detect_every=1):
+    """
+    Process decoded frames as they are produced and return a list of results
+    
+    Args:
+        frames (iterable): Yields (frame_number, timestamp_sec, frame) tuples,
+            e.g. generate_pics_from_videos.iter_frames
+        batch_size (int): Frames buffered per detector call, defaults to YOLO_BATCH_SIZE
+        on_result (callable): Called with each result as soon as it is available
+        timer (StageTimer): Receives "yolo" and "pose" timings and the frame count
+        tracker (tracking.Tracker): When given, the detector runs on every
+            detect_every-th frame only and results come from the tracks
+        detect_every (int): See tracker
+        
+    Returns:
+        list: List of detection results, one per frame
+    """
+    batch_size = batch_size or YOLO_BATCH_SIZE
+    results_list = []
+    batch = []
+    seen = 0
     
-    for img_name in images:
-        if img_name.lower().endswith((".jpg", ".jpeg", ".png")):
-            img_path = os.path.join(directory_path, img_name)
-            result = classify_image(img_path)
+    def flush():
+        images = [frame for _, _, frame in batch]
+        labels = [f"frame_{frame_number:04d}" for frame_number, _, _ in batch]
+        if tracker is None:
+            results = classify_frames(images, labels, batch_size, timer)
+        else:
+            timestamps = [timestamp for _, timestamp, _ in batch]
+            first = seen - len(batch)
+            detect_flags = [(first + i) % detect_every == 0 for i in range(len(batch))]
+            results = classify_tracked_frames(images, labels, timestamps, detect_flags, tracker, batch_size, timer)
+        for (_, timestamp, _), result in zip(batch, results):
+            result["timestamp"] = round(timestamp, 2)
             results_list.append(result)
+            if on_result is not None:
+                on_result(result)
+        if timer is not None:
+            timer.add_frames(len(batch))
+        batch.clear()
+    
+    for item in frames:
+        batch.append(item)
+        seen += 1
+        # With a tracker, a batch holds detect_every times as many frames for the same detector load
+        if len(batch) >= batch_size * (detect_every if tracker is not None else 1):
+            flush()
+    
+    if batch:
+        flush()
     
-    cv2.destroyAllWindows()  # Close any open windows when done
     return results_list
 
 # Example usage
 if __name__ == "__main__":
-    dir_path = "Test_Cheating_Detection\\frames\\kokita"
-    results = process_directory(dir_path)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run detection on every image of a directory.")
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    results = process_directory(args.directory)
     
     # Print the results as JSON strings
     for result in results:
         print(json.dumps(result, indent=4))
-    
-    # Or return the entire list as a single JSON string
-    # all_results_json = json.dumps(results, indent=4)
-    # print(all_results_json)
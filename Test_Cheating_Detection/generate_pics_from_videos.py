@@ -1,6 +1,8 @@
 import cv2
 import os
-from datetime import datetime
+import time
+
+from Test_Cheating_Detection.metrics import timed
 
 
 def clear_directory(directory):
@@ -28,18 +30,43 @@ def clear_directory(directory):
     print(f"Cleared {file_count} image files from {directory}")
 
 
-def extract_frames(video_path, output_dir, interval=2):
+# Fallback frame rate when the container reports none (common for webm/mkv)
+DEFAULT_FPS = 30.0
+
+
+def _frame_timestamp(video, count, fps):
     """
-    Extracts frames from a video at specified time intervals.
+    Returns the presentation time in seconds of the frame last grabbed.
+    
+    The decoder's own timestamp is preferred because CAP_PROP_FPS and
+    CAP_PROP_FRAME_COUNT are unreliable for variable-frame-rate uploads;
+    count / fps is only used when the backend reports no timestamp.
+    """
+    pos_msec = video.get(cv2.CAP_PROP_POS_MSEC)
+    if pos_msec > 0 or count == 0:
+        return pos_msec / 1000.0
+    return count / (fps if fps > 0 else DEFAULT_FPS)
+
+
+def iter_frames(video_path, interval=2, mode="grab", timer=None):
+    """
+    Yields decoded frames from a video at specified time intervals, without
+    writing anything to disk.
     
     Args:
         video_path (str): Path to the video file
-        output_dir (str): Directory to save the extracted frames
         interval (int): Time interval in seconds between frames
+        mode (str): "grab" advances with grab() and only retrieves the frames
+            that are kept; "seek" jumps to each sample time with
+            CAP_PROP_POS_MSEC, which skips decoding between keyframes but
+            lands on the nearest frame the container can seek to
+        timer (StageTimer): Receives one "decode" sample per yielded frame
+        
+    Yields:
+        tuple: (frame_number, timestamp_sec, frame) where frame is a BGR numpy array
     """
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-        print(f"Created output directory: {output_dir}")
+    if mode not in ("grab", "seek"):
+        raise ValueError(f"Unsupported sampling mode: {mode}")
 
     video = cv2.VideoCapture(video_path)
     
@@ -48,61 +75,160 @@ def extract_frames(video_path, output_dir, interval=2):
         return
     
     fps = video.get(cv2.CAP_PROP_FPS)
-    total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-    duration = total_frames / fps
     
-    print(f"Video FPS: {fps}")
-    print(f"Total frames: {total_frames}")
-    print(f"Video duration: {duration:.2f} seconds")
+    count = 0
+    frame_count = 0
+    next_due = 0.0
+    last_timestamp = 0.0
+    seeked = False
+    decode_started = time.perf_counter()
+    
+    try:
+        while True:
+            if mode == "seek" and frame_count > 0 and not seeked:
+                video.set(cv2.CAP_PROP_POS_MSEC, next_due * 1000)
+                count = int(next_due * (fps if fps > 0 else DEFAULT_FPS))
+                # If the seek lands early, grab forward from there
+                seeked = True
+                
+                if video.get(cv2.CAP_PROP_POS_MSEC) <= last_timestamp * 1000:
+                    # Streams without a seek index (e.g. MediaRecorder webm)
+                    # rewind instead: reopen and grab forward
+                    print(f"Seeking not supported for {video_path}, falling back to grab()")
+                    video.release()
+                    video = cv2.VideoCapture(video_path)
+                    mode = "grab"
+                    count = 0
+
+            if not video.grab():
+                break
+            
+            timestamp = _frame_timestamp(video, count, fps)
+            count += 1
+            
+            if timestamp < next_due:
+                continue
+            
+            success, frame = video.retrieve()
+            if not success:
+                break
+            
+            if timer is not None:
+                timer.record("decode", time.perf_counter() - decode_started)
+            yield frame_count, timestamp, frame
+            decode_started = time.perf_counter()
+            frame_count += 1
+            last_timestamp = timestamp
+            seeked = False
+            
+            while next_due <= timestamp:
+                next_due += interval
+    finally:
+        video.release()
+
+
+def iter_adaptive_frames(video_path, sampler, timer=None):
+    """
+    Yields decoded frames chosen by an AdaptiveSampler: static footage is
+    thinned out and footage around incidents is sampled densely.
+    
+    Args:
+        video_path (str): Path to the video file
+        sampler (AdaptiveSampler): Decides which frames are decoded and kept
+        timer (StageTimer): Receives one "decode" sample per yielded frame
+        
+    Yields:
+        tuple: (frame_number, timestamp_sec, frame) where frame is a BGR numpy array
+    """
+    video = cv2.VideoCapture(video_path)
+    
+    if not video.isOpened():
+        print(f"Error: Could not open video file {video_path}")
+        return
     
-    frame_interval = int(fps * interval)
+    fps = video.get(cv2.CAP_PROP_FPS)
     
     count = 0
     frame_count = 0
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    decode_started = time.perf_counter()
     
-    while True:
-        success, frame = video.read()
-        
-        if not success:
-            break
-        
-        if count % frame_interval == 0:
-            current_time_sec = count / fps
+    try:
+        while video.grab():
+            timestamp = _frame_timestamp(video, count, fps)
+            count += 1
+            
+            if not sampler.due(timestamp):
+                continue
             
-            filename = f"frame_{frame_count:04d}.jpg"
-            output_path = os.path.join(output_dir, filename)
+            success, frame = video.retrieve()
+            if not success:
+                break
             
+            if sampler.accept(timestamp, frame):
+                if timer is not None:
+                    timer.record("decode", time.perf_counter() - decode_started)
+                yield frame_count, timestamp, frame
+                decode_started = time.perf_counter()
+                frame_count += 1
+    finally:
+        video.release()
+
+
+def extract_frames(video_path, output_dir, interval=2, mode="grab", timer=None, verbose=True):
+    """
+    Extracts frames from a video at specified time intervals.
+    
+    Args:
+        video_path (str): Path to the video file
+        output_dir (str): Directory to save the extracted frames
+        interval (int): Time interval in seconds between frames
+        mode (str): Sampling mode, see iter_frames
+        timer (StageTimer): Receives "decode" and "write" timings
+        verbose (bool): Print every saved frame
+
+    Returns:
+        int: Number of frames written
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Created output directory: {output_dir}")
+    
+    frame_count = 0
+    
+    for frame_number, current_time_sec, frame in iter_frames(video_path, interval, mode, timer):
+        filename = f"frame_{frame_number:04d}.jpg"
+        output_path = os.path.join(output_dir, filename)
+        
+        with timed(timer, "write"):
             cv2.imwrite(output_path, frame)
+        if verbose:
             print(f"Saved frame at {current_time_sec:.2f}s: {output_path}")
-            frame_count += 1
-        
-        count += 1
+        frame_count += 1
     
-    video.release()
     print(f"Extracted {frame_count} frames from the video")
+    return frame_count
 
 
 if __name__ == "__main__":
-    # Hardcoded parameters
-    video_path = r"C:\Users\PC\Desktop\grad\WIN_20250502_18_19_02_Pro.mp4"
-    candidate_name = "amr"  
-    interval = 2  
-    clear_old_frames = True  
-    
-    base_output_dir = os.path.join("content")
-    candidate_dir = os.path.join(base_output_dir, candidate_name)
-    
-    if not os.path.exists(base_output_dir):
-        os.makedirs(base_output_dir)
-        print(f"Created base output directory: {base_output_dir}")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extract one frame every `interval` seconds of a video.")
+    parser.add_argument("video_path")
+    parser.add_argument("--candidate", required=True, help="frames go to <output-dir>/<candidate>")
+    parser.add_argument("--interval", type=float, default=2)
+    parser.add_argument("--mode", choices=("grab", "seek"), default="grab")
+    parser.add_argument("--output-dir", default="content")
+    parser.add_argument("--keep-old", action="store_true", help="do not clear previously extracted frames")
+    args = parser.parse_args()
+
+    candidate_dir = os.path.join(args.output_dir, args.candidate)
     
-    print(f"Processing video: {video_path}")
-    print(f"Candidate name: {candidate_name}")
+    print(f"Processing video: {args.video_path}")
+    print(f"Candidate name: {args.candidate}")
     print(f"Saving frames to: {candidate_dir}")
-    print(f"Frame interval: {interval} seconds")
+    print(f"Frame interval: {args.interval} seconds")
     
-    if clear_old_frames:
+    if not args.keep_old:
         clear_directory(candidate_dir)
     
-    extract_frames(video_path, candidate_dir, interval)
\ No newline at end of file
+    extract_frames(args.video_path, candidate_dir, args.interval, args.mode)
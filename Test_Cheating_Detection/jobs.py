@@ -0,0 +1,265 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from Test_Cheating_Detection.metrics import record_video
+from common.result_cache import ResultCache
+from common.workspace import remove_workspace
+
+# Worker processes each hold their own YOLO and MediaPipe Pose instance
+CPU_COUNT = os.cpu_count() or 1
+PROCTOR_WORKERS = int(os.getenv("PROCTOR_WORKERS", str(max(1, CPU_COUNT // 2))))
+# Finished jobs are forgotten after this many seconds
+JOB_TTL = int(os.getenv("PROCTOR_JOB_TTL", "3600"))
+# At most this many finished jobs are kept, the oldest are forgotten first
+MAX_FINISHED_JOBS = int(os.getenv("PROCTOR_MAX_FINISHED_JOBS", "1000"))
+# Live (WebSocket) sessions get their own workers, so their frames never wait behind a whole video
+LIVE_WORKERS = int(os.getenv("PROCTOR_LIVE_WORKERS", "1"))
+# Largest JPEG accepted from a live session
+LIVE_MAX_FRAME_BYTES = int(os.getenv("PROCTOR_LIVE_MAX_FRAME_BYTES", str(2 * 1024 * 1024)))
+
+_executor = None
+_live_executor = None
+jobs = {}
+_futures = {}
+# Results keyed by video content hash + analysis parameters, and the jobs
+# currently computing one of those keys
+result_cache = ResultCache("proctor")
+_inflight = {}
+# jobs, _futures and _inflight are also changed from the executor's callback thread
+_jobs_lock = threading.Lock()
+
+
+def _init_worker():
+    """
+    Runs once in every worker process: splits the cores between workers and
+    loads the models, so the first job does not pay for it.
+    """
+    import numpy as np
+    import torch
+
+    torch.set_num_threads(max(1, CPU_COUNT // PROCTOR_WORKERS))
+
+    # Importing frame_analysis loads YOLO and Pose; one dummy frame warms them up
+    from Test_Cheating_Detection.frame_analysis import classify_frame
+    classify_frame(np.zeros((480, 640, 3), dtype=np.uint8), "warmup")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_job(candidate_name, video_path, interval, adaptive, workspace, recording_id=None):
+    from Test_Cheating_Detection.detection import process_candidate_video
+    from Test_Cheating_Detection.rescoring import evict_recordings, recording_path
+
+    try:
+        result = process_candidate_video(
+            candidate_name, video_path, interval, adaptive=adaptive,
+            recording_path=recording_path(recording_id) if recording_id is not None else None
+        )
+        if recording_id is not None:
+            result["Recording ID"] = recording_id
+            evict_recordings()
+        return result
+    finally:
+        if workspace is not None:
+            remove_workspace(workspace)
+        elif os.path.exists(video_path):
+            os.remove(video_path)
+
+
+def _classify_jpeg(data):
+    """
+    Decode and analyze one live frame. Returns None for undecodable data.
+    """
+    import cv2
+    import numpy as np
+    from Test_Cheating_Detection.frame_analysis import classify_frame
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    result = classify_frame(image)
+    return {
+        "people_count": result["people_count"],
+        "direction-looking": result["direction-looking"],
+        "communication_device_present": result["communication_device_present"]
+    }
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PROCTOR_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+    return _executor
+
+
+def get_live_executor():
+    global _live_executor
+    if _live_executor is None:
+        _live_executor = ProcessPoolExecutor(
+            max_workers=LIVE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+    return _live_executor
+
+
+def submit_live_frame(data):
+    """
+    Analyze one JPEG-encoded live frame on the live workers.
+
+    Returns:
+        concurrent.futures.Future: Resolves to the frame's result, or None if it could not be decoded
+    """
+    return get_live_executor().submit(_classify_jpeg, data)
+
+
+def warm_pool():
+    """
+    Start the worker processes (and load their models) ahead of the first upload.
+    """
+    get_executor().submit(_ping)
+    if LIVE_WORKERS > 0:
+        get_live_executor().submit(_ping)
+
+
+def _prune_jobs():
+    """
+    Forget finished jobs older than JOB_TTL, and the oldest ones beyond
+    MAX_FINISHED_JOBS. Called with _jobs_lock held.
+    """
+    now = time.time()
+    finished = sorted(
+        (job["finished_at"], job_id) for job_id, job in jobs.items() if job["finished_at"] is not None
+    )
+    excess = len(finished) - MAX_FINISHED_JOBS
+    for index, (finished_at, job_id) in enumerate(finished):
+        if index < excess or now - finished_at > JOB_TTL:
+            jobs.pop(job_id, None)
+            _futures.pop(job_id, None)
+
+
+def _on_done(job_id, future, cache_key=None, owner=True):
+    """
+    Record a finished job. Only the job that actually ran the analysis (the
+    owner) stores the result in the cache and counts towards the metrics;
+    jobs served from the cache or from a duplicate in-flight job do not.
+    """
+    try:
+        result = future.result()
+    except Exception as e:
+        result = None
+        error = str(e)
+
+    if owner and result is not None:
+        if "Timings" in result:
+            record_video(result["Timings"])
+        if cache_key is not None:
+            # Timings describe this run only, a cache hit has none
+            result_cache.set(cache_key, {k: v for k, v in result.items() if k != "Timings"})
+    with _jobs_lock:
+        if owner and cache_key is not None:
+            _inflight.pop(cache_key, None)
+
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        if result is None:
+            job["error"] = error
+            job["status"] = "failed"
+        else:
+            # The same result can be shared by several jobs, each keeps its own candidate name
+            job["result"] = dict(result, Candidate=job["candidate"])
+            if not owner:
+                job["result"].pop("Timings", None)
+            job["status"] = "completed"
+        job["finished_at"] = time.time()
+
+
+def submit_job(candidate_name, video_path, interval=2, adaptive=False, workspace=None, cache_key=None):
+    """
+    Queue a saved video for analysis on the worker pool.
+
+    Args:
+        candidate_name (str): Name reported in the result
+        video_path (str): Video to analyze, removed once the job has finished
+        interval (int): Time interval in seconds between analyzed frames
+        adaptive (bool): Use the scene-change-aware sampler instead of a fixed interval
+        workspace (str): Per-job scratch directory, removed with the video once the job has finished
+        cache_key (str): Result cache key of the video and parameters; a cached
+            or already running analysis with the same key is reused
+
+    Returns:
+        str: The job id
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "candidate": candidate_name,
+        "status": "queued",
+        "submitted_at": time.time(),
+        "finished_at": None,
+        "result": None,
+        "error": None,
+        "cached": False
+    }
+
+    cached = result_cache.get(cache_key) if cache_key is not None else None
+    with _jobs_lock:
+        _prune_jobs()
+        jobs[job_id] = job
+        # Read once: the running job's callback may remove it at any moment
+        running = _inflight.get(cache_key) if cache_key is not None else None
+        if cached is None and running is None:
+            # Raw detections are recorded under the cache key, for re-scoring
+            future = get_executor().submit(_run_job, candidate_name, video_path, interval, adaptive, workspace, cache_key)
+            _futures[job_id] = future
+            if cache_key is not None:
+                _inflight[cache_key] = future
+            owner = True
+        else:
+            job["cached"] = True
+            if cached is not None:
+                future = Future()
+                future.set_result(cached)
+            else:
+                future = running
+            _futures[job_id] = future
+            owner = False
+
+    if not owner:
+        # Duplicate upload: nothing to analyze
+        if workspace is not None:
+            remove_workspace(workspace)
+        elif os.path.exists(video_path):
+            os.remove(video_path)
+    # Outside the lock: the callback runs right away for a finished future
+    future.add_done_callback(lambda f: _on_done(job_id, f, cache_key, owner=owner))
+    return job_id
+
+
+def get_job(job_id):
+    """
+    Returns the job record, or None for unknown (or expired) job ids.
+    """
+    with _jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return None
+        future = _futures.get(job_id)
+        if job["status"] == "queued" and future is not None and future.running():
+            job["status"] = "running"
+        return job
+
+
+def get_future(job_id):
+    return _futures.get(job_id)
@@ -0,0 +1,73 @@
+from collections import Counter
+
+# Consecutive analyzed frames a condition must hold before it is reported,
+# so a single misdetection does not raise an alert
+LIVE_CONFIRM_FRAMES = 2
+
+
+class LiveMonitor:
+    """
+    Turns the per-frame results of a live session into alerts.
+
+    An alert is raised when a condition (phone visible, extra person, candidate
+    missing, looking away) has held for `confirm_frames` analyzed frames, and a
+    matching "<name>_cleared" message when it stops.
+
+    Args:
+        confirm_frames (int): Consecutive frames needed to raise or clear an alert
+    """
+
+    CONDITIONS = {
+        "phone_detected": lambda r: r["communication_device_present"],
+        "extra_person": lambda r: r["people_count"] > 1,
+        "candidate_missing": lambda r: r["people_count"] == 0,
+        "looking_away": lambda r: r["direction-looking"] != "at-system"
+    }
+
+    def __init__(self, confirm_frames=LIVE_CONFIRM_FRAMES):
+        self.confirm_frames = confirm_frames
+        self.active = {name: False for name in self.CONDITIONS}
+        self.streak = {name: 0 for name in self.CONDITIONS}
+        self.alerts = Counter()
+        self.frames = 0
+        self.dropped = 0
+        self.invalid = 0
+
+    def update(self, result, timestamp):
+        """
+        Feed one analyzed frame.
+
+        Returns:
+            list: Alert messages to send, possibly empty
+        """
+        self.frames += 1
+        messages = []
+        for name, condition in self.CONDITIONS.items():
+            # The streak counts frames that disagree with the current state
+            if bool(condition(result)) != self.active[name]:
+                self.streak[name] += 1
+            else:
+                self.streak[name] = 0
+            if self.streak[name] < self.confirm_frames:
+                continue
+
+            self.active[name] = not self.active[name]
+            self.streak[name] = 0
+            if self.active[name]:
+                self.alerts[name] += 1
+            messages.append({
+                "type": "alert",
+                "alert": name if self.active[name] else f"{name}_cleared",
+                "timestamp": round(timestamp, 2),
+                "people_count": result["people_count"]
+            })
+        return messages
+
+    def summary(self):
+        return {
+            "type": "summary",
+            "frames_analyzed": self.frames,
+            "frames_dropped": self.dropped,
+            "frames_invalid": self.invalid,
+            "alerts": dict(self.alerts)
+        }
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+class StageTimer:
+    """
+    Collects wall-clock time per pipeline stage (decode, yolo, pose, ...)
+    for one video.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.frames = 0
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def add_frames(self, count):
+        self.frames += count
+
+    def summary(self):
+        """
+        Returns:
+            dict: Per-stage totals and latency percentiles plus frames/sec
+        """
+        wall = time.perf_counter() - self.started
+        stages = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            stages[name] = {
+                "calls": len(ordered),
+                "total_sec": round(sum(ordered), 4),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2)
+            }
+        return {
+            "frames": self.frames,
+            "wall_sec": round(wall, 4),
+            "frames_per_sec": round(self.frames / wall, 2) if wall > 0 else 0.0,
+            "stages": stages
+        }
+
+
+def percentile(ordered, q):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def timed(timer, name):
+    """
+    timer.stage(name), or a no-op when no timer is being collected.
+    """
+    return timer.stage(name) if timer is not None else nullcontext()
+
+
+# Process-wide totals across all analyzed videos
+_lock = threading.Lock()
+_totals = {
+    "videos": 0,
+    "frames": 0,
+    "wall_sec": 0.0,
+    "stage_sec": defaultdict(float)
+}
+
+
+def record_video(summary):
+    """
+    Add one video's StageTimer summary to the process-wide totals.
+    """
+    with _lock:
+        _totals["videos"] += 1
+        _totals["frames"] += summary["frames"]
+        _totals["wall_sec"] += summary["wall_sec"]
+        for name, stage in summary["stages"].items():
+            _totals["stage_sec"][name] += stage["total_sec"]
+
+
+def snapshot():
+    with _lock:
+        return {
+            "videos": _totals["videos"],
+            "frames": _totals["frames"],
+            "wall_sec": round(_totals["wall_sec"], 4),
+            "frames_per_sec": round(_totals["frames"] / _totals["wall_sec"], 2) if _totals["wall_sec"] > 0 else 0.0,
+            "stage_sec": {name: round(total, 4) for name, total in _totals["stage_sec"].items()}
+        }
+
+
+def render_prometheus():
+    """
+    The totals in Prometheus text exposition format.
+    """
+    data = snapshot()
+    lines = [
+        "# TYPE proctor_videos_total counter",
+        f"proctor_videos_total {data['videos']}",
+        "# TYPE proctor_frames_total counter",
+        f"proctor_frames_total {data['frames']}",
+        "# TYPE proctor_wall_seconds_total counter",
+        f"proctor_wall_seconds_total {data['wall_sec']}",
+        "# TYPE proctor_stage_seconds_total counter",
+    ]
+    for name, total in data["stage_sec"].items():
+        lines.append(f'proctor_stage_seconds_total{{stage="{name}"}} {total}')
+    return "\n".join(lines) + "\n"
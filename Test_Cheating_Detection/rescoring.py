@@ -0,0 +1,147 @@
+import os
+
+import time
+
+import numpy as np
+
+from common.result_cache import evict_lru
+from Test_Cheating_Detection.config import DETECTION_CLASSES, DEVICE_CLASSES, DETECTION_MIN_CONFIDENCE, DIRECTION_THRESHOLD, RECORDINGS_DIR, RECORDINGS_MAX_BYTES
+from Test_Cheating_Detection.timeline import DIRECTIONS, FrameTable, candidate_report
+
+# The rules the live pipeline applies; a re-scoring policy overrides any of them
+DEFAULT_POLICY = {
+    "device_classes": DEVICE_CLASSES,
+    "device_min_confidence": DETECTION_MIN_CONFIDENCE,
+    "person_min_confidence": DETECTION_MIN_CONFIDENCE,
+    "direction_threshold": DIRECTION_THRESHOLD
+}
+
+
+def recording_path(recording_id):
+    return os.path.join(RECORDINGS_DIR, f"{recording_id}.npz")
+
+
+def load_recording(recording_id):
+    """
+    Returns the recorded FrameTable, or None for unknown recording ids.
+    """
+    # Ids are cache keys generated by us; anything else must not reach the filesystem
+    if not recording_id.isalnum() or not os.path.exists(recording_path(recording_id)):
+        return None
+    table = FrameTable.load(recording_path(recording_id))
+    # The modification time doubles as the last-used time for eviction
+    now = time.time()
+    os.utime(recording_path(recording_id), (now, now))
+    return table
+
+
+def evict_recordings(max_bytes=RECORDINGS_MAX_BYTES):
+    """
+    Remove least recently used recordings until RECORDINGS_DIR fits in max_bytes.
+    """
+    if os.path.isdir(RECORDINGS_DIR):
+        evict_lru(RECORDINGS_DIR, max_bytes, ".npz")
+
+
+def resolve_policy(policy):
+    """
+    Merge a partial policy over DEFAULT_POLICY, rejecting unknown keys.
+    """
+    unknown = set(policy or {}) - set(DEFAULT_POLICY)
+    if unknown:
+        raise ValueError(f"Unknown policy keys: {sorted(unknown)}")
+    policy = dict(DEFAULT_POLICY, **(policy or {}))
+    if not isinstance(policy["device_classes"], list) or not all(isinstance(c, str) for c in policy["device_classes"]):
+        raise ValueError("'device_classes' must be a list of class names.")
+    for key in ("device_min_confidence", "person_min_confidence", "direction_threshold"):
+        if not isinstance(policy[key], (int, float)) or isinstance(policy[key], bool):
+            raise ValueError(f"'{key}' must be a number.")
+    return policy
+
+
+def directions_from_keypoints(keypoints, threshold):
+    """
+    Vectorized direction_from_keypoints over (frames, 3, 2) keypoints.
+
+    Returns:
+        np.ndarray: Index into DIRECTIONS per frame; "at-system" where keypoints are NaN
+    """
+    nose, left_eye, right_eye = keypoints[:, 0], keypoints[:, 1], keypoints[:, 2]
+    mid_eye = (left_eye + right_eye) / 2
+    offset = nose - mid_eye
+    dist_between_eyes = np.linalg.norm(right_eye - left_eye, axis=1)
+
+    with np.errstate(invalid="ignore"):
+        at_system = (np.abs(offset[:, 0]) < dist_between_eyes * threshold) & (np.abs(offset[:, 1]) < dist_between_eyes * threshold)
+        up, down = offset[:, 1] < 0, offset[:, 1] > 0
+        left, right = offset[:, 0] < 0, offset[:, 0] > 0
+
+    direction = np.zeros(len(keypoints), dtype=np.int8)
+    for name, mask in (("up-left", up & left), ("up-right", up & right), ("down-left", down & left), ("down-right", down & right)):
+        direction[mask & ~at_system] = DIRECTIONS.index(name)
+    return direction
+
+
+def rescore(table, policy=None):
+    """
+    Re-apply detection rules to recorded raw detections, without running any model.
+
+    Args:
+        table (FrameTable): Recorded table, with raw detections
+        policy (dict): Overrides of DEFAULT_POLICY:
+            device_classes: classes counted as a communication device
+            device_min_confidence / person_min_confidence: confidence cut-offs
+            direction_threshold: fraction of the eye distance the nose may be
+                off-centre while still looking at the screen
+
+    Returns:
+        FrameTable: New table with recomputed people_count, device and direction
+
+    Note:
+        Only recorded classes can be used, and head orientation only exists for
+        frames that had exactly one person when the video was analyzed.
+    """
+    if not table.has_detections:
+        raise ValueError("This recording has no raw detections to re-score.")
+    policy = resolve_policy(policy)
+
+    frames = len(table)
+    frame_of = np.repeat(np.arange(frames), np.diff(table.det_offsets))
+    class_names = table.class_names.tolist()
+    # The detection classes are always recorded; older recordings list only the classes they saw
+    recorded = set(class_names) | set(DETECTION_CLASSES)
+    # Dropping the others silently would read as "no device seen"
+    unknown = [name for name in policy["device_classes"] if name not in recorded]
+    if unknown:
+        raise ValueError(f"Classes not recorded for this video: {unknown}; recorded: {sorted(recorded)}")
+
+    def class_mask(names):
+        ids = [class_names.index(name) for name in names if name in class_names]
+        return np.isin(table.det_class, ids)
+
+    person = class_mask(["person"]) & (table.det_conf >= policy["person_min_confidence"])
+    device = class_mask(policy["device_classes"]) & (table.det_conf >= policy["device_min_confidence"])
+
+    people_count = np.bincount(frame_of[person], minlength=frames)
+    device_present = np.bincount(frame_of[device], minlength=frames) > 0
+
+    direction = directions_from_keypoints(table.keypoints, policy["direction_threshold"])
+    direction[people_count != 1] = DIRECTIONS.index("at-system")
+
+    return FrameTable(
+        table.labels, table.timestamps, people_count, device_present, direction,
+        table.det_offsets, table.det_boxes, table.det_class, table.det_conf, table.class_names, table.keypoints
+    )
+
+
+def rescore_recording(recording_id, candidate_name, policy=None):
+    """
+    Returns:
+        dict: The proctoring response under the given policy, or None for unknown recordings
+    """
+    table = load_recording(recording_id)
+    if table is None:
+        return None
+    result = candidate_report(candidate_name, rescore(table, policy))
+    result["Policy"] = resolve_policy(policy)
+    return result
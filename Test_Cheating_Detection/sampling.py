@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+
+
+class AdaptiveSampler:
+    """
+    Decides which frames of a video are worth a YOLO + pose pass.
+
+    Candidate frames are taken every `interval` seconds, or every
+    `min_interval` seconds for `burst_duration` seconds after an incident
+    (communication device or more than one person). A candidate that is
+    nearly identical to the last analyzed frame is skipped, unless
+    `max_interval` seconds have passed since the last analysis.
+
+    Args:
+        interval (float): Seconds between candidate frames on quiet footage
+        min_interval (float): Seconds between candidate frames after an incident
+        max_interval (float): Longest gap allowed between two analyzed frames
+        diff_threshold (float): Mean absolute difference (0-255) between the
+            downscaled grayscale frames under which a frame counts as static
+        burst_duration (float): Seconds of dense sampling after an incident
+    """
+
+    def __init__(self, interval=2, min_interval=0.5, max_interval=10, diff_threshold=4.0, burst_duration=6):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.diff_threshold = diff_threshold
+        self.burst_duration = burst_duration
+
+        self.last_candidate = None
+        self.last_analyzed = None
+        self.last_signature = None
+        self.burst_until = -1.0
+
+        self.candidates = 0
+        self.analyzed = 0
+        self.skipped_static = 0
+
+    def in_burst(self, timestamp):
+        return timestamp < self.burst_until
+
+    def due(self, timestamp):
+        """
+        Returns True when the frame at timestamp should be decoded and checked.
+        """
+        if self.last_candidate is None:
+            return True
+        step = self.min_interval if self.in_burst(timestamp) else self.interval
+        return timestamp >= self.last_candidate + step
+
+    def accept(self, timestamp, frame):
+        """
+        Returns True when the decoded candidate frame should be analyzed.
+        """
+        self.last_candidate = timestamp
+        self.candidates += 1
+
+        signature = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (32, 32), interpolation=cv2.INTER_AREA)
+        signature = signature.astype(np.int16)
+
+        if (
+            self.last_signature is not None
+            and not self.in_burst(timestamp)
+            and timestamp - self.last_analyzed < self.max_interval
+            and np.abs(signature - self.last_signature).mean() < self.diff_threshold
+        ):
+            self.skipped_static += 1
+            return False
+
+        self.last_signature = signature
+        self.last_analyzed = timestamp
+        self.analyzed += 1
+        return True
+
+    def observe(self, result):
+        """
+        Feed back a detection result; incidents switch to dense sampling.
+        """
+        if result["communication_device_present"] or result["people_count"] > 1:
+            self.burst_until = max(self.burst_until, result["timestamp"] + self.burst_duration)
+
+    def stats(self):
+        return {
+            "candidates": self.candidates,
+            "analyzed": self.analyzed,
+            "skipped_static": self.skipped_static
+        }
@@ -0,0 +1,221 @@
+import os
+
+import numpy as np
+
+DIRECTIONS = ["at-system", "up-left", "up-right", "down-left", "down-right"]
+
+
+class FrameTable:
+    """
+    Per-frame detection results stored column by column in NumPy arrays,
+    instead of one dict per frame.
+
+    Columns:
+        labels: frame label ("frame_0042" or the image path), str
+        timestamps: seconds into the video, NaN when unknown (frame directories)
+        people_count: int16
+        device: communication device present, bool
+        direction: index into DIRECTIONS, int8
+
+    Raw model output, when recorded (see rescoring.py):
+        det_offsets: detections of frame i are rows det_offsets[i]:det_offsets[i + 1]
+        det_boxes: [x1, y1, x2, y2] per detection, float32
+        det_class: index into class_names per detection, int16
+        det_conf: confidence per detection, float32
+        keypoints: (frames, 3, 2) nose / left eye / right eye pixels, NaN where
+            no pose was estimated
+    """
+
+    RAW_COLUMNS = ("det_offsets", "det_boxes", "det_class", "det_conf", "class_names", "keypoints")
+
+    def __init__(self, labels, timestamps, people_count, device, direction,
+                 det_offsets=None, det_boxes=None, det_class=None, det_conf=None, class_names=None, keypoints=None):
+        self.labels = np.asarray(labels, dtype=str)
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+        self.people_count = np.asarray(people_count, dtype=np.int16)
+        self.device = np.asarray(device, dtype=bool)
+        self.direction = np.asarray(direction, dtype=np.int8)
+
+        self.det_offsets = det_offsets
+        self.det_boxes = det_boxes
+        self.det_class = det_class
+        self.det_conf = det_conf
+        self.class_names = class_names
+        self.keypoints = keypoints
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def has_detections(self):
+        return self.det_offsets is not None
+
+    def _raw_from_results(self, results, recorded_classes=()):
+        # Classes that were recorded but never seen are kept too, so a re-scoring
+        # policy can tell "not detected" from "not recorded"
+        class_names = sorted({c for r in results for c in r["detections"]["classes"]} | set(recorded_classes))
+        class_index = {name: i for i, name in enumerate(class_names)}
+        counts = [len(r["detections"]["classes"]) for r in results]
+
+        self.det_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+        self.det_boxes = np.array(
+            [box for r in results for box in r["detections"]["boxes"]], dtype=np.float32
+        ).reshape(-1, 4)
+        self.det_class = np.array(
+            [class_index[c] for r in results for c in r["detections"]["classes"]], dtype=np.int16
+        )
+        self.det_conf = np.array(
+            [conf for r in results for conf in r["detections"]["confidences"]], dtype=np.float32
+        )
+        self.class_names = np.asarray(class_names, dtype=str)
+        self.keypoints = np.full((len(results), 3, 2), np.nan, dtype=np.float32)
+        for i, r in enumerate(results):
+            if r.get("keypoints") is not None:
+                self.keypoints[i] = r["keypoints"]
+
+    @classmethod
+    def from_results(cls, results, recorded_classes=()):
+        """
+        Build the table from the list of dicts returned by process_frames /
+        process_directory. recorded_classes are the classes the detector was
+        asked to keep raw detections of.
+        """
+        table = cls(
+            labels=[r["image_path"] or "" for r in results],
+            timestamps=[r.get("timestamp", np.nan) for r in results],
+            people_count=[r["people_count"] for r in results],
+            device=[r["communication_device_present"] for r in results],
+            direction=[DIRECTIONS.index(r["direction-looking"]) for r in results]
+        )
+        if all("detections" in r for r in results):
+            table._raw_from_results(results, recorded_classes)
+        return table
+
+    def save(self, path):
+        """
+        Write the table to a compressed .npz file.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        raw = {name: getattr(self, name) for name in self.RAW_COLUMNS} if self.has_detections else {}
+        np.savez_compressed(
+            path,
+            labels=self.labels,
+            timestamps=self.timestamps,
+            people_count=self.people_count,
+            device=self.device,
+            direction=self.direction,
+            **raw
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            raw = {name: data[name] for name in cls.RAW_COLUMNS if name in data}
+            return cls(data["labels"], data["timestamps"], data["people_count"], data["device"], data["direction"], **raw)
+
+
+def runs(mask):
+    """
+    Start and end (inclusive) row indices of every run of True values.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], np.asarray(mask, dtype=np.int8), [0]))))
+    return edges[0::2], edges[1::2] - 1
+
+
+def format_time(seconds):
+    """
+    "mm:ss", or "h:mm:ss" past the first hour.
+    """
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    if hours:
+        return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"
+    return f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+def incident_intervals(table, mask):
+    """
+    Merge consecutive flagged frames into intervals.
+
+    Args:
+        table (FrameTable): The analyzed frames
+        mask (np.ndarray): One bool per frame, True where the incident is seen
+
+    Returns:
+        list: One dict per interval with "start"/"end" ("mm:ss", None when the
+            timestamps are unknown), the first and last frame labels and the
+            number of flagged frames
+    """
+    intervals = []
+    for start, end in zip(*runs(mask)):
+        known = not np.isnan(table.timestamps[start])
+        intervals.append({
+            "start": format_time(table.timestamps[start]) if known else None,
+            "end": format_time(table.timestamps[end]) if known else None,
+            "start_frame": str(table.labels[start]),
+            "end_frame": str(table.labels[end]),
+            "frames": int(end - start + 1)
+        })
+    return intervals
+
+
+def summarize(table):
+    """
+    Vectorized aggregation of a FrameTable.
+
+    Returns:
+        dict: Flagged frame masks, people count changes and the incident timeline
+    """
+    phone = table.device
+    multiple_people = table.people_count > 1
+    looking_away = table.direction != DIRECTIONS.index("at-system")
+    changes = np.flatnonzero(np.diff(table.people_count)) + 1
+
+    return {
+        "phone_usage": phone,
+        "multiple_people": multiple_people,
+        "people_count_changes": [
+            {
+                "frame": str(table.labels[i]),
+                "previous_count": int(table.people_count[i - 1]),
+                "current_count": int(table.people_count[i])
+            }
+            for i in changes
+        ],
+        "unique_people_counts": np.unique(table.people_count).tolist(),
+        "timeline": {
+            "phone": incident_intervals(table, phone),
+            "multiple_people": incident_intervals(table, multiple_people),
+            "looking_away": incident_intervals(table, looking_away)
+        }
+    }
+
+
+def candidate_report(candidate_name, table, summary=None):
+    """
+    The proctoring response for one candidate.
+
+    Args:
+        candidate_name (str): Name reported in the result
+        table (FrameTable): The analyzed (or re-scored) frames
+        summary (dict): summarize(table), when the caller already has it
+
+    Returns:
+        dict: Counts, flagged frame names and the incident timeline
+    """
+    if summary is None:
+        summary = summarize(table)
+    phone_frames = [os.path.basename(label) for label in table.labels[summary["phone_usage"]]]
+    multiple_people_frames = [os.path.basename(label) for label in table.labels[summary["multiple_people"]]]
+
+    return {
+        "Candidate": candidate_name,
+        "Phone usage detected": len(phone_frames),
+        "Frames with phone detection": phone_frames,
+        "People detected (more than 1)": len(multiple_people_frames),
+        "Frames with multiple people detection": multiple_people_frames,
+        "People count changes detected": len(summary["people_count_changes"]),
+        "Total frames processed": len(table),
+        # Consecutive flagged frames merged into intervals, e.g. phone visible 12:04-12:31
+        "Timeline": summary["timeline"]
+    }
@@ -0,0 +1,176 @@
+import itertools
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """
+    IoU between every box of a (N, 4) and b (M, 4), xyxy.
+    """
+    a, b = np.asarray(a, dtype=np.float32).reshape(-1, 4), np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+class Track:
+    def __init__(self, track_id, cls, box, score, timestamp):
+        self.id = track_id
+        self.cls = cls
+        self.box = np.asarray(box, dtype=np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.score = score
+        self.hits = 1
+        self.misses = 0
+        self.confirmed = False
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.frames_since_update = 0
+
+    def predict(self):
+        # Constant velocity, per sampled frame
+        self.box = self.box + self.velocity
+        self.frames_since_update += 1
+
+    def update(self, box, score, timestamp):
+        box = np.asarray(box, dtype=np.float32)
+        steps = max(1, self.frames_since_update)
+        # Undo the blind prediction, then blend in the observed motion
+        previous = self.box - self.velocity * self.frames_since_update
+        self.velocity = 0.5 * self.velocity + 0.5 * (box - previous) / steps
+        self.box = box
+        self.score = score
+        self.hits += 1
+        self.misses = 0
+        self.last_seen = timestamp
+        self.frames_since_update = 0
+
+
+class Tracker:
+    """
+    IoU tracker in the style of ByteTrack: confident detections are matched to
+    tracks first, weaker ones can only keep an existing track alive, and a
+    track is reported only once it has been seen `min_hits` times. Between
+    detector passes (`predict`) tracks move at their last velocity.
+
+    Args:
+        iou_threshold (float): Minimum IoU between a track and a detection to match them
+        high_confidence (float): Detections at or above this can start new tracks
+        min_hits (int): Detector matches before a track is confirmed (and counted)
+        max_misses (int): Detector passes a confirmed track may go unmatched
+            before it is dropped
+    """
+
+    def __init__(self, iou_threshold=0.3, high_confidence=0.5, min_hits=2, max_misses=2):
+        self.iou_threshold = iou_threshold
+        self.high_confidence = high_confidence
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self.tracks = []
+        self.events = []
+        self.updates = 0
+        self._ids = itertools.count(1)
+
+    def predict(self, timestamp):
+        """
+        Advance every track one sampled frame without a detector pass.
+        """
+        for track in self.tracks:
+            track.predict()
+        return self.active()
+
+    def _match(self, tracks, boxes, classes, indices):
+        """
+        Greedy highest-IoU matching of the given detection indices to tracks
+        of the same class. Returns the matched (track, detection) pairs.
+        """
+        if not tracks or not indices:
+            return []
+        iou = iou_matrix([t.box for t in tracks], [boxes[i] for i in indices])
+        for ti, track in enumerate(tracks):
+            for di, i in enumerate(indices):
+                if classes[i] != track.cls:
+                    iou[ti, di] = 0
+
+        pairs = []
+        while iou.size and iou.max() >= self.iou_threshold:
+            ti, di = np.unravel_index(iou.argmax(), iou.shape)
+            pairs.append((tracks[ti], indices[di]))
+            iou[ti, :] = 0
+            iou[:, di] = 0
+        return pairs
+
+    def update(self, boxes, classes, confidences, timestamp):
+        """
+        Feed one detector pass.
+
+        Args:
+            boxes (list): [x1, y1, x2, y2] per detection
+            classes (list): Class name per detection
+            confidences (list): Confidence per detection
+            timestamp (float): Seconds into the video
+
+        Returns:
+            list: The confirmed tracks after this frame
+        """
+        self.updates += 1
+        for track in self.tracks:
+            track.predict()
+
+        high = [i for i, conf in enumerate(confidences) if conf >= self.high_confidence]
+        low = [i for i, conf in enumerate(confidences) if conf < self.high_confidence]
+
+        matched = self._match(self.tracks, boxes, classes, high)
+        unmatched_tracks = [t for t in self.tracks if t not in {track for track, _ in matched}]
+        matched += self._match(unmatched_tracks, boxes, classes, low)
+
+        matched_tracks = set()
+        used = set()
+        for track, i in matched:
+            track.update(boxes[i], confidences[i], timestamp)
+            matched_tracks.add(track)
+            used.add(i)
+            if not track.confirmed and track.hits >= self.min_hits:
+                self._confirm(track)
+
+        survivors = []
+        for track in self.tracks:
+            if track not in matched_tracks:
+                track.misses += 1
+                # Unconfirmed tracks get no second chance
+                if not track.confirmed or track.misses > self.max_misses:
+                    if track.confirmed:
+                        self.events.append({
+                            "event": "disappeared",
+                            "track_id": track.id,
+                            "class": track.cls,
+                            "timestamp": round(track.last_seen, 2)
+                        })
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+
+        for i in high:
+            if i not in used:
+                track = Track(next(self._ids), classes[i], boxes[i], confidences[i], timestamp)
+                self.tracks.append(track)
+                # Whatever is in view when tracking starts is taken as already there
+                if self.updates == 1 or self.min_hits <= 1:
+                    self._confirm(track)
+
+        return self.active()
+
+    def _confirm(self, track):
+        track.confirmed = True
+        self.events.append({
+            "event": "appeared",
+            "track_id": track.id,
+            "class": track.cls,
+            "timestamp": round(track.first_seen, 2)
+        })
+
+    def active(self):
+        return [t for t in self.tracks if t.confirmed]
@@ -1,12 +1,29 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from cv_agent.app import router as router1
 from question_and_answer_agent.app import router as router2
 from interview_agent.app import router as router3
+from interview_agent.speech_to_text import warm_whisper_models
 from Test_Cheating_Detection.app import router as router4
+from Test_Cheating_Detection.jobs import warm_pool
 from candidate_agent.app import router as router5
+from common.uploads import router as router6
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm-up runs once here; startup hooks on the routers would repeat it
+    # for every app that includes them
+    warm_pool()
+    # Loaded in the background so the server comes up immediately
+    asyncio.get_running_loop().run_in_executor(None, warm_whisper_models)
+    yield
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware before including routers
 app.add_middleware(
@@ -23,6 +40,7 @@ app.include_router(router2, prefix="/exam-generation-agent")
 app.include_router(router3, prefix="/interview-agent")
 app.include_router(router4, prefix="/proctor-agent")
 app.include_router(router5, prefix="/candidate-agent")
+app.include_router(router6, prefix="/uploads")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Finished analyses are stored as JSON files under RESULT_CACHE_DIR/<namespace>/,
+# the least recently used ones are evicted once the store grows past the limit
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "result_cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    sha256 of a file's contents, read chunk by chunk.
+    """
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def cache_key(content_hash: str, params: dict) -> str:
+    """
+    Key of one analysis: the video's content hash plus every parameter that
+    changes the result (interval, model variants, thresholds, ...).
+    """
+    payload = json.dumps({"content": content_hash, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def evict_lru(directory: str, max_bytes: int, suffix: str) -> int:
+    """
+    Remove the files ending in suffix with the oldest modification time until
+    they fit in max_bytes. Readers touch files they use, so this is LRU.
+
+    Returns:
+        int: Number of files removed
+    """
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+
+    removed = 0
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+        except OSError:
+            pass
+        total -= size
+    return removed
+
+
+class ResultCache:
+    """
+    Persistent local store of JSON-serializable analysis results.
+
+    Args:
+        namespace (str): Sub-directory, one per pipeline
+        root (str): Base directory of the store
+        max_bytes (int): Size of the namespace after which the least recently
+            used entries are removed
+    """
+
+    def __init__(self, namespace, root=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = os.path.join(root, namespace)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns the stored result, or None on a miss.
+        """
+        if not RESULT_CACHE_ENABLED:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # The modification time doubles as the last-used time for eviction
+        now = time.time()
+        os.utime(path, (now, now))
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if not RESULT_CACHE_ENABLED:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(value, f)
+        # Readers never see a half-written entry
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the namespace fits in max_bytes.
+        """
+        with self._lock:
+            evict_lru(self.directory, self.max_bytes, ".json")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import APIRouter, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+
+router = APIRouter()
+
+# Uploads are copied to disk this many bytes at a time
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(4 * 1024 ** 3)))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Resumable uploads without a new chunk for this many seconds are removed
+UPLOAD_TTL = int(os.getenv("UPLOAD_TTL", str(24 * 3600)))
+
+# One lock per resumable upload, so concurrent PATCHes cannot interleave their appends
+_upload_locks = {}
+
+
+def _write_chunk(out, chunk, hasher=None):
+    if hasher is not None:
+        hasher.update(chunk)
+    out.write(chunk)
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES, hasher=None) -> int:
+    """
+    Stream an uploaded file to disk in CHUNK_SIZE pieces instead of reading it
+    into memory at once. Hashing and writing run in the threadpool, so a
+    multi-GB upload does not block the event loop.
+
+    Args:
+        file: The uploaded file
+        dest_path: Where to write it
+        max_bytes: Uploads larger than this are rejected with 413
+        hasher: Optional hashlib object updated with every chunk, so the
+            content hash comes for free with the copy
+
+    Returns:
+        int: Number of bytes written
+    """
+    size = 0
+    try:
+        with open(dest_path, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes} byte limit.")
+                await run_in_threadpool(_write_chunk, out, chunk, hasher)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return size
+
+
+# === Resumable uploads ===
+# POST   /uploads              -> create an upload, returns its id
+# PATCH  /uploads/{upload_id}  -> append the request body at the "Upload-Offset" header
+# GET    /uploads/{upload_id}  -> current offset, so a dropped client knows where to resume
+# DELETE /uploads/{upload_id}  -> discard it
+
+def _data_path(upload_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{upload_id}.part")
+
+
+def _meta_path(upload_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{upload_id}.json")
+
+
+def get_upload(upload_id: str):
+    """
+    Returns the upload's metadata with its current offset, or None if unknown.
+    """
+    # Ids are generated by us; anything else must not reach the filesystem
+    if not upload_id.isalnum() or not os.path.exists(_meta_path(upload_id)):
+        return None
+    with open(_meta_path(upload_id)) as f:
+        meta = json.load(f)
+    meta["offset"] = os.path.getsize(_data_path(upload_id))
+    meta["complete"] = meta["size"] is not None and meta["offset"] >= meta["size"]
+    return meta
+
+
+def copy_upload(upload_id: str, dest_path: str, hasher=None) -> dict:
+    """
+    Copy the bytes received so far to dest_path, so analysis can start on the
+    prefix of an upload that is still in progress. hasher, if given, is
+    updated with the copied bytes. Blocking; async callers run it in the threadpool.
+
+    Returns:
+        dict: The upload's metadata at the time of the copy
+    """
+    meta = get_upload(upload_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    with open(_data_path(upload_id), "rb") as src, open(dest_path, "wb") as dst:
+        remaining = meta["offset"]
+        while remaining > 0:
+            chunk = src.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if hasher is not None:
+                hasher.update(chunk)
+            dst.write(chunk)
+            remaining -= len(chunk)
+    return meta
+
+
+def delete_upload(upload_id: str):
+    for path in (_data_path(upload_id), _meta_path(upload_id)):
+        if os.path.exists(path):
+            os.remove(path)
+    _upload_locks.pop(upload_id, None)
+
+
+def sweep_uploads(ttl: int = UPLOAD_TTL) -> int:
+    """
+    Remove abandoned uploads: those whose last chunk arrived more than ttl
+    seconds ago. Uploads with a request in progress are left alone.
+
+    Returns:
+        int: Number of uploads removed
+    """
+    removed = 0
+    now = time.time()
+    for name in os.listdir(UPLOAD_DIR):
+        upload_id, ext = os.path.splitext(name)
+        if ext != ".json" or not upload_id.isalnum():
+            continue
+        lock = _upload_locks.get(upload_id)
+        if lock is not None and lock.locked():
+            continue
+        data_path = _data_path(upload_id)
+        last_activity = os.path.getmtime(data_path if os.path.exists(data_path) else _meta_path(upload_id))
+        if now - last_activity > ttl:
+            delete_upload(upload_id)
+            removed += 1
+    return removed
+
+
+@router.post("")
+async def create_upload(request: Request):
+    data = await request.json()
+    filename = data.get("filename")
+    size = data.get("size")
+    if not filename or not isinstance(filename, str):
+        raise HTTPException(status_code=400, detail="A valid 'filename' field is required.")
+    if size is not None and (not isinstance(size, int) or size < 0):
+        raise HTTPException(status_code=400, detail="'size' must be a non-negative integer.")
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit.")
+
+    # Creating uploads is what fills the directory, so that is when old ones are cleared
+    sweep_uploads()
+
+    upload_id = uuid.uuid4().hex
+    with open(_meta_path(upload_id), "w") as f:
+        json.dump({"upload_id": upload_id, "filename": os.path.basename(filename), "size": size, "created_at": time.time()}, f)
+    open(_data_path(upload_id), "wb").close()
+
+    return JSONResponse(status_code=201, content={"upload_id": upload_id, "offset": 0})
+
+
+@router.patch("/{upload_id}")
+async def append_upload(upload_id: str, request: Request):
+    meta = get_upload(upload_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="An integer 'Upload-Offset' header is required.")
+
+    # The offset check and the append must not be split by another PATCH
+    async with _upload_locks.setdefault(upload_id, asyncio.Lock()):
+        meta = get_upload(upload_id)
+        if meta is None:
+            raise HTTPException(status_code=404, detail="Upload not found.")
+        if offset != meta["offset"]:
+            # The client resends from the offset we actually have
+            return JSONResponse(status_code=409, content={"error": "Offset mismatch.", "offset": meta["offset"]})
+
+        limit = meta["size"] if meta["size"] is not None else MAX_UPLOAD_BYTES
+        written = offset
+        with open(_data_path(upload_id), "ab") as out:
+            async for chunk in request.stream():
+                written += len(chunk)
+                if written > limit:
+                    out.truncate(offset)
+                    raise HTTPException(status_code=413, detail="Chunk exceeds the declared upload size.")
+                await run_in_threadpool(_write_chunk, out, chunk)
+
+        meta = get_upload(upload_id)
+    return JSONResponse(content={"upload_id": upload_id, "offset": meta["offset"], "complete": meta["complete"]})
+
+
+@router.get("/{upload_id}")
+async def upload_status(upload_id: str):
+    meta = get_upload(upload_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    return JSONResponse(content=meta)
+
+
+@router.delete("/{upload_id}")
+async def discard_upload(upload_id: str):
+    if get_upload(upload_id) is None:
+        raise HTTPException(status_code=404, detail="Upload not found.")
+    # Waits for an append in progress
+    async with _upload_locks.setdefault(upload_id, asyncio.Lock()):
+        delete_upload(upload_id)
+    return Response(status_code=204)
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+# Every request gets its own scratch directory under WORKSPACE_ROOT/<pipeline>/
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", os.path.join(tempfile.gettempdir(), "grad-project-jobs"))
+DEFAULT_MAX_CONCURRENCY = 2
+
+_limiters = {}
+
+
+def create_workspace(pipeline: str) -> str:
+    """
+    Create an isolated scratch directory for one request of a pipeline.
+    The caller is responsible for remove_workspace.
+    """
+    path = os.path.join(WORKSPACE_ROOT, pipeline, uuid.uuid4().hex)
+    os.makedirs(path)
+    return path
+
+
+def remove_workspace(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@contextmanager
+def job_workspace(pipeline: str):
+    """
+    Scratch directory that is removed, with everything in it, on exit.
+    """
+    path = create_workspace(pipeline)
+    try:
+        yield path
+    finally:
+        remove_workspace(path)
+
+
+def pipeline_concurrency(pipeline: str) -> int:
+    """
+    How many requests of a pipeline may run at once, from <PIPELINE>_MAX_CONCURRENCY.
+    """
+    return int(os.getenv(f"{pipeline.upper()}_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY)))
+
+
+def pipeline_limiter(pipeline: str) -> asyncio.Semaphore:
+    """
+    Semaphore bounding how many requests of a pipeline run at once, see pipeline_concurrency.
+    """
+    if pipeline not in _limiters:
+        _limiters[pipeline] = asyncio.Semaphore(pipeline_concurrency(pipeline))
+    return _limiters[pipeline]
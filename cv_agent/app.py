@@ -6,6 +6,7 @@ from cv_agent.cv_processor import extract_text_from_pdf, index_resume_to_pinecon
 from cv_agent.agent import choose_best_candiate
 from fastapi import APIRouter
 from cv_agent.agent import generate_job_detailss
+from common.uploads import save_upload
 router = APIRouter()
 
 @router.post("/upload-resume_to_pinecone/")
@@ -17,8 +18,7 @@ async def upload_pdf(
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
     
     temp_path = f"temp_{id_key}.pdf"
-    with open(temp_path, "wb") as f:
-        f.write(await file.read())
+    await save_upload(file, temp_path)
 
     try:
         text = extract_text_from_pdf(temp_path)
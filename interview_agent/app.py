@@ -1,21 +1,92 @@
 from unittest import result
-from fastapi import APIRouter, Request, File, UploadFile
-from fastapi.responses import JSONResponse
-from interview_agent.technical_depth_analysis import run_exam_pipeline
-from interview_agent.speech_to_text import synthesize_and_encode_audio, transcribe_mp3
-from interview_agent.emotion import analyze_emotional_state
+from fastapi import APIRouter, Request, File, Form, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+from interview_agent.technical_depth_analysis import arun_exam_pipeline
+from interview_agent.speech_to_text import synthesize_and_encode_audio, transcribe_mp3, submit_chunks, stitch_segments
+from interview_agent.audio_prep import prepare_audio
+from interview_agent.emotion import analyze_emotional_state, EMOTION_ANALYSIS_FPS
 from interview_agent.pixtral import analyze_with_pixtral_model
-from interview_agent.report import analyze_video_workflow
-import shutil
+from interview_agent.report import run_video_workflow, workflow_params, emotional_analysis_params
+from fastapi.concurrency import run_in_threadpool
+from common.uploads import save_upload
+from common.workspace import create_workspace, job_workspace, pipeline_limiter, remove_workspace
+from common.result_cache import ResultCache, cache_key
+import hashlib
+import json
 import os
+import asyncio
 router = APIRouter()
 
+# Re-uploads of an already analyzed video are answered from disk
+emotion_cache = ResultCache("emotional-analysis")
+interview_cache = ResultCache("interview-analysis")
+
+def upload_path(workspace, file, default_ext):
+    # Keep the uploaded extension so ffmpeg/OpenCV pick the right demuxer
+    ext = os.path.splitext(file.filename or "")[-1].lower() or default_ext
+    return os.path.join(workspace, f"upload{ext}")
+
 @router.post("/transcribe-audio")
-async def transcribe_audio(file: UploadFile = File(...)):
-    text = transcribe_mp3(file)
+async def transcribe_audio(file: UploadFile = File(...), stream: bool = Form(False)):
+    if stream:
+        # The upload must be on disk before the response starts; the stream cleans up
+        workspace = create_workspace("transcription")
+        try:
+            audio_path = upload_path(workspace, file, ".mp3")
+            await save_upload(file, audio_path)
+        except BaseException:
+            remove_workspace(workspace)
+            raise
+        return StreamingResponse(transcription_events(audio_path, workspace), media_type="text/event-stream")
+
+    with job_workspace("transcription") as workspace:
+        audio_path = upload_path(workspace, file, ".mp3")
+        await save_upload(file, audio_path)
+        async with pipeline_limiter("transcription"):
+            text = await run_in_threadpool(transcribe_mp3, audio_path)
 
     return {"transcription": text}
 
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def transcription_events(audio_path, workspace):
+    """
+    Server-sent events: "started" with the speech found, one "partial" per
+    transcribed chunk, in order, then "completed" with the whole transcript
+    (or "failed").
+    """
+    futures = []
+    try:
+        async with pipeline_limiter("transcription"):
+            audio = await run_in_threadpool(prepare_audio, audio_path)
+            yield sse("started", {
+                "chunks": len(audio["chunks"]),
+                "duration_sec": audio["duration_sec"],
+                "speech_sec": audio["speech_sec"]
+            })
+            futures = submit_chunks(audio["chunks"])
+            segments = []
+            for index, (chunk, future) in enumerate(zip(audio["chunks"], futures)):
+                chunk_segments = stitch_segments(chunk, await asyncio.wrap_future(future))
+                segments += chunk_segments
+                yield sse("partial", {
+                    "chunk": index,
+                    "segments": chunk_segments,
+                    "text": "".join(segment["text"] for segment in chunk_segments)
+                })
+        yield sse("completed", {
+            "transcription": "".join(segment["text"] for segment in segments),
+            "segments": segments
+        })
+    except Exception as e:
+        yield sse("failed", {"error": str(e)})
+    finally:
+        # Client gone or failure: chunks that have not started are not worth running
+        for future in futures:
+            future.cancel()
+        remove_workspace(workspace)
+
 @router.post("/text-to-speech")
 async def text_to_speech(request: Request):
     data = await request.json()
@@ -38,6 +109,8 @@ async def evaluate(request: Request):
     question_list = data.get("question_list")
     answer_list = data.get("answer_list")
     golden_answer_list = data.get("golden_answer_list")
+    # Optional question types ("mcq", "true_false", "essay", "coding"); inferred when missing
+    type_list = data.get("type_list")
     
     # Basic validation
     if not all(isinstance(lst, list) for lst in [question_list, answer_list, golden_answer_list]):
@@ -52,45 +125,67 @@ async def evaluate(request: Request):
             content={"error": "All lists must have the same length."}
         )
 
-    result = run_exam_pipeline(
+    if type_list is not None and (
+        not isinstance(type_list, list) or len(type_list) != len(question_list)
+        or not all(qtype is None or isinstance(qtype, str) for qtype in type_list)
+    ):
+        return JSONResponse(
+            status_code=400,
+            content={"error": "type_list must be a list with one type (a string or null) per question."}
+        )
+
+    # Answers are graded concurrently, see rate_limit.RateLimiter
+    result = await arun_exam_pipeline(
         question_list=question_list,
         golden_answers_list=golden_answer_list,
-        candidate_answers=answer_list
+        candidate_answers=answer_list,
+        type_list=type_list
     )
 
     return JSONResponse(content=result)
 
 @router.post("/emotional-analysis")
 async def emotional_analysis(file: UploadFile = File(...)):
-    # Save the uploaded video file to disk or process as needed
-    contents = await file.read()
-    file_location = "interview_agent/video.mp4"
-    with open(file_location, "wb") as f:
-        f.write(contents)
-    video_path = file_location
-    analyze_emotional_state(video_path, frame_interval=2)
-    result= analyze_with_pixtral_model("interview_agent/output")
-    shutil.rmtree("interview_agent/output", ignore_errors=True)
-    os.remove(video_path)
-    return JSONResponse(content={
+    # Each request works in its own scratch directory, removed afterwards
+    with job_workspace("interview") as workspace:
+        video_path = upload_path(workspace, file, ".mp4")
+        hasher = hashlib.sha256()
+        await save_upload(file, video_path, hasher=hasher)
+        key = cache_key(hasher.hexdigest(), emotional_analysis_params())
+        cached = emotion_cache.get(key)
+        if cached is not None:
+            return JSONResponse(content=dict(cached, cached=True))
+
+        async with pipeline_limiter("interview"):
+            analysis = await run_in_threadpool(analyze_emotional_state, video_path, EMOTION_ANALYSIS_FPS)
+            result = await run_in_threadpool(analyze_with_pixtral_model, analysis)
+    content = {
         "message": "Emotional analysis completed successfully.",
         "result": result
-    })
+    }
+    emotion_cache.set(key, content)
+    return JSONResponse(content=content)
 
 
 @router.post("/interview-analysis")
 async def interview_analysis(file: UploadFile = File(...)):
-    # Save the uploaded video file to disk or process as needed
-    contents = await file.read()
-    file_location = "interview_agent/video.mp4"
-    with open(file_location, "wb") as f:
-        f.write(contents)
-    video_path = file_location
-    result = analyze_video_workflow(video_path)
-    shutil.rmtree("interview_agent/output", ignore_errors=True)
-    os.remove(video_path)
+    # Each request works in its own scratch directory, removed afterwards
+    with job_workspace("interview") as workspace:
+        video_path = upload_path(workspace, file, ".mp4")
+        hasher = hashlib.sha256()
+        await save_upload(file, video_path, hasher=hasher)
+        key = cache_key(hasher.hexdigest(), workflow_params())
+        cached = interview_cache.get(key)
+        if cached is not None:
+            return JSONResponse(content=dict(cached, cached=True))
+
+        async with pipeline_limiter("interview"):
+            # Independent stages run concurrently, see report.workflow_stages
+            result, timings = await run_video_workflow(video_path)
     
-    return JSONResponse(content={
+    content = {
         "message": "Interview analysis completed successfully.",
         "result": result
-    })
+    }
+    interview_cache.set(key, content)
+    return JSONResponse(content=dict(content, timings=timings))
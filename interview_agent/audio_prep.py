@@ -0,0 +1,168 @@
+import os
+import subprocess
+
+import numpy as np
+
+# Whisper's native input: 16 kHz mono
+SAMPLE_RATE = 16000
+# "energy" (built in), "webrtc" (needs the webrtcvad package) or "off"
+AUDIO_VAD = os.getenv("AUDIO_VAD", "energy")
+# Speech chunks handed to the transcriber are at most this long (Whisper's window)
+MAX_CHUNK_SEC = float(os.getenv("AUDIO_MAX_CHUNK_SEC", "30"))
+
+FRAME_MS = 30
+# Speech is kept with this much context on both sides
+SPEECH_PAD_SEC = 0.2
+# Pauses shorter than this stay inside a speech segment
+MIN_SILENCE_SEC = 0.6
+MIN_SPEECH_SEC = 0.25
+# Silence inserted between speech pieces that are joined into one chunk
+JOIN_GAP_SEC = 0.2
+
+
+def extract_audio(path: str) -> np.ndarray:
+    """
+    Decode the audio track of any audio/video file once, with ffmpeg.
+
+    Returns:
+        np.ndarray: 16 kHz mono float32 samples in [-1, 1]
+    """
+    cmd = ["ffmpeg", "-nostdin", "-i", path, "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-loglevel", "error", "-"]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg is required to extract audio but was not found on PATH")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to extract audio: {e.stderr.decode(errors='ignore')}")
+    return np.frombuffer(out, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _runs(mask):
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[0::2], edges[1::2]))
+
+
+def _energy_speech_frames(audio, frame):
+    """
+    Frames whose energy is well above the recording's own noise floor.
+    """
+    frames = len(audio) // frame
+    rms = np.sqrt(np.mean(audio[:frames * frame].reshape(frames, frame) ** 2, axis=1))
+    db = 20 * np.log10(rms + 1e-10)
+    noise_floor = np.percentile(db, 10)
+    return db > max(noise_floor + 10, -50)
+
+
+def _webrtc_speech_frames(audio, frame, aggressiveness=2):
+    import webrtcvad
+
+    vad = webrtcvad.Vad(aggressiveness)
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    frames = len(pcm) // frame
+    return np.array([vad.is_speech(pcm[i * frame:(i + 1) * frame].tobytes(), SAMPLE_RATE) for i in range(frames)], dtype=bool)
+
+
+def detect_speech(audio: np.ndarray, method: str = AUDIO_VAD) -> list:
+    """
+    Find the speech in a recording.
+
+    Args:
+        audio (np.ndarray): 16 kHz mono samples
+        method (str): "energy", "webrtc" or "off" (everything counts as speech)
+
+    Returns:
+        list: (start_sec, end_sec) of each speech segment
+    """
+    duration = len(audio) / SAMPLE_RATE
+    frame = SAMPLE_RATE * FRAME_MS // 1000
+    if method == "off" or len(audio) < frame:
+        return [(0.0, duration)] if len(audio) else []
+    if method == "webrtc":
+        speech = _webrtc_speech_frames(audio, frame)
+    elif method == "energy":
+        speech = _energy_speech_frames(audio, frame)
+    else:
+        raise ValueError(f"Unsupported VAD method: {method}")
+
+    frame_sec = FRAME_MS / 1000
+    # Close short pauses, then drop blips too short to be words
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and (end - start) * frame_sec < MIN_SILENCE_SEC:
+            speech[start:end] = True
+    segments = []
+    for start, end in _runs(speech):
+        if (end - start) * frame_sec < MIN_SPEECH_SEC:
+            continue
+        segments.append((max(0.0, start * frame_sec - SPEECH_PAD_SEC), min(duration, end * frame_sec + SPEECH_PAD_SEC)))
+
+    # Padding can make neighbours overlap
+    merged = []
+    for start, end in segments:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def speech_chunks(audio: np.ndarray, segments: list, max_chunk_sec: float = MAX_CHUNK_SEC) -> list:
+    """
+    Pack speech segments into chunks of at most max_chunk_sec, dropping the
+    silence between them. Segments longer than that are split.
+
+    Returns:
+        list: One dict per chunk with "audio" (samples) and "pieces", a list of
+              (chunk_offset_sec, source_start_sec, duration_sec) to map chunk
+              times back to the original recording
+    """
+    pieces = []
+    for start, end in segments:
+        while end - start > 0:
+            length = min(end - start, max_chunk_sec)
+            pieces.append((start, length))
+            start += length
+
+    chunks = []
+    current, parts, offset = [], [], 0.0
+    gap = np.zeros(int(JOIN_GAP_SEC * SAMPLE_RATE), dtype=np.float32)
+    for start, length in pieces:
+        if parts and offset + JOIN_GAP_SEC + length > max_chunk_sec:
+            chunks.append({"audio": np.concatenate(current), "pieces": parts})
+            current, parts, offset = [], [], 0.0
+        if parts:
+            current.append(gap)
+            offset += JOIN_GAP_SEC
+        samples = audio[int(start * SAMPLE_RATE):int((start + length) * SAMPLE_RATE)]
+        current.append(samples)
+        parts.append((offset, start, length))
+        offset += len(samples) / SAMPLE_RATE
+    if parts:
+        chunks.append({"audio": np.concatenate(current), "pieces": parts})
+    return chunks
+
+
+def to_source_time(chunk: dict, t: float) -> float:
+    """
+    Map a time inside a chunk back to the original recording.
+    """
+    for offset, source_start, length in reversed(chunk["pieces"]):
+        if t >= offset:
+            return source_start + min(t - offset, length)
+    return chunk["pieces"][0][1]
+
+
+def prepare_audio(path: str, method: str = AUDIO_VAD) -> dict:
+    """
+    Extract the audio once and keep only the speech.
+
+    Returns:
+        dict: "chunks" (see speech_chunks), "duration_sec" of the recording and
+              "speech_sec" actually passed on to the transcriber
+    """
+    audio = extract_audio(path)
+    segments = detect_speech(audio, method)
+    return {
+        "chunks": speech_chunks(audio, segments),
+        "duration_sec": round(len(audio) / SAMPLE_RATE, 2),
+        "speech_sec": round(sum(end - start for start, end in segments), 2)
+    }
@@ -0,0 +1,112 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from common.workspace import pipeline_concurrency
+
+# I/O-bound stages (LLM calls) and libraries that release the GIL run on
+# threads; CPU-bound pure Python work can be sent to worker processes
+THREAD_WORKERS = int(os.getenv("INTERVIEW_THREAD_WORKERS", "8"))
+# One process per interview the limiter lets in, so their emotion scans overlap
+PROCESS_WORKERS = int(os.getenv("INTERVIEW_PROCESS_WORKERS", str(pipeline_concurrency("interview"))))
+
+_thread_pool = None
+_process_pool = None
+
+
+def get_pool(kind):
+    global _thread_pool, _process_pool
+    if kind == "thread":
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=THREAD_WORKERS, thread_name_prefix="interview-dag")
+        return _thread_pool
+    if kind == "process":
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+    raise ValueError(f"Unsupported executor: {kind}")
+
+
+class Stage:
+    """
+    One node of a workflow.
+
+    Args:
+        name (str): Unique stage name, also the key of its result
+        fn (callable): Called with the results of `deps`, in order, followed by `args`
+        deps (tuple): Names of the stages whose results fn needs
+        args (tuple): Extra positional arguments appended after the dependency results
+        executor (str): "thread" or "process" (fn and its arguments must then be picklable)
+    """
+
+    def __init__(self, name, fn, deps=(), args=(), executor="thread"):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.args = tuple(args)
+        self.executor = executor
+
+
+async def run_dag(stages):
+    """
+    Run the stages as soon as their dependencies are done, independent ones
+    concurrently.
+
+    Args:
+        stages (list): Stage objects; dependencies must name stages of the list
+
+    Returns:
+        tuple: (results by stage name, timings) where timings holds each
+               stage's start offset and duration in seconds and the total wall time
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    tasks = {}
+    timings = {}
+
+    async def run(stage):
+        inputs = [await tasks[dep] for dep in stage.deps]
+        stage_started = time.perf_counter()
+        result = await loop.run_in_executor(get_pool(stage.executor), stage.fn, *inputs, *stage.args)
+        timings[stage.name] = {
+            "start_sec": round(stage_started - started, 3),
+            "duration_sec": round(time.perf_counter() - stage_started, 3),
+            "executor": stage.executor
+        }
+        return result
+
+    # A cycle would leave tasks waiting on each other forever
+    visiting, done = set(), set()
+
+    def check_cycles(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through stage {name}")
+        visiting.add(name)
+        for dep in by_name[name].deps:
+            check_cycles(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for stage in stages:
+        check_cycles(stage.name)
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.ensure_future(run(stage))
+    try:
+        results = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    return results, {"stages": timings, "wall_sec": round(time.perf_counter() - started, 3)}
@@ -1,22 +1,138 @@
 import cv2
-from deepface import DeepFace
+from interview_agent.emotion_engine import scan_emotions, dominant_emotion
 from collections import defaultdict
+from dataclasses import dataclass, field
+import glob
 import json
-from tqdm import tqdm
 import os
 
-def analyze_emotional_state(video_path, frame_interval=30):
-    cap = cv2.VideoCapture(video_path)
+# Frames analyzed per second of video, whatever the camera's frame rate
+EMOTION_ANALYSIS_FPS = float(os.getenv("EMOTION_ANALYSIS_FPS", "2"))
+# Used when the container reports no frame rate
+DEFAULT_FPS = 30.0
+JPEG_QUALITY = 90
+
+
+@dataclass
+class Snapshot:
+    """
+    A frame worth showing, kept as an encoded JPEG.
+    """
+    name: str
+    frame_idx: int
+    jpeg: bytes
+
+
+@dataclass
+class EmotionAnalysis:
+    """
+    Result of analyze_emotional_state, handed to the Pixtral stage in memory.
+    """
+    emotion_distribution: dict
+    confidence_inference: str
+    stress_inference: str
+    snapshots: list = field(default_factory=list)
+    frames_analyzed: int = 0
+
+    def snapshot_frame(self, name):
+        for snapshot in self.snapshots:
+            if snapshot.name == name:
+                return snapshot.frame_idx
+        return None
+
+    def to_dict(self) -> dict:
+        """
+        The confidence_stress_analysis.json report.
+        """
+        fear_frame = self.snapshot_frame("fear_over_50")
+        return {
+            "emotion_distribution": self.emotion_distribution,
+            "confidence_inference": self.confidence_inference,
+            "stress_inference": self.stress_inference,
+            "snapshots": {
+                "fear_over_50_frame": f"frame_{fear_frame}" if fear_frame is not None else "not_found",
+                "peak_happy_frame": self.snapshot_frame("peak_happy"),
+                "peak_stress_frame": self.snapshot_frame("peak_stress")
+            }
+        }
+
+    def save(self, output_dir: str):
+        """
+        Write the report and the snapshots as <name>_frame_<idx>.jpg under output_dir/frames.
+        """
+        frames_dir = os.path.join(output_dir, "frames")
+        os.makedirs(frames_dir, exist_ok=True)
+        for snapshot in self.snapshots:
+            with open(os.path.join(frames_dir, f"{snapshot.name}_frame_{snapshot.frame_idx}.jpg"), "wb") as f:
+                f.write(snapshot.jpeg)
+        with open(os.path.join(output_dir, "confidence_stress_analysis.json"), "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, output_dir: str):
+        """
+        Read back what save wrote.
+        """
+        with open(os.path.join(output_dir, "confidence_stress_analysis.json")) as f:
+            report = json.load(f)
+        snapshots = []
+        for path in sorted(glob.glob(os.path.join(output_dir, "frames", "*_frame_*.jpg"))):
+            name, frame_idx = os.path.splitext(os.path.basename(path))[0].rsplit("_frame_", 1)
+            with open(path, "rb") as f:
+                snapshots.append(Snapshot(name, int(frame_idx), f.read()))
+        return cls(report["emotion_distribution"], report["confidence_inference"], report["stress_inference"], snapshots)
+
+
+def encode_jpeg(frame) -> bytes:
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("Could not encode snapshot")
+    return buffer.tobytes()
+
+
+def sample_frames(cap, analysis_fps):
+    """
+    Yields (frame_idx, frame) every 1 / analysis_fps seconds of video time.
+    Frames in between are only grabbed, never decoded.
+    """
     fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = 1.0 / analysis_fps
+    frame_idx = 0
+    next_due = 0.0
+    while cap.grab():
+        # The decoder's timestamp copes with variable frame rates; count / fps is the fallback
+        pos_msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        timestamp = pos_msec / 1000.0 if pos_msec > 0 or frame_idx == 0 else frame_idx / (fps if fps > 0 else DEFAULT_FPS)
+        if timestamp >= next_due:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            yield frame_idx, frame
+            # Skip ahead whole steps if frames were far apart
+            next_due += step * (int((timestamp - next_due) / step) + 1)
+        frame_idx += 1
 
-    emotion_tally = defaultdict(int)
 
-    frame_idx = 0
-    pbar = tqdm(total=total_frames)
+def analyze_emotional_state(video_path, analysis_fps=EMOTION_ANALYSIS_FPS, output_dir=None) -> EmotionAnalysis:
+    """
+    Scan the candidate's emotions through the video.
+
+    Args:
+        video_path (str): Interview video
+        analysis_fps (float): Frames analyzed per second of video
+        output_dir (str): Also write the report and snapshots here (see EmotionAnalysis.save)
+
+    Returns:
+        EmotionAnalysis: Distribution, inferences and JPEG snapshots
+    """
+    if analysis_fps <= 0:
+        raise ValueError("analysis_fps must be positive")
+    cap = cv2.VideoCapture(video_path)
+
+    emotion_tally = defaultdict(int)
 
     # Snapshot placeholders
-    fear_snapshot_taken = False
+    fear_snapshot = None
     peak_happy_score = -1
     peak_happy_frame = None
     peak_happy_img = None
@@ -25,58 +141,36 @@ def analyze_emotional_state(video_path, frame_interval=30):
     peak_stress_frame = None
     peak_stress_img = None
 
-    os.makedirs("interview_agent/output/frames", exist_ok=True)
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        if frame_idx % frame_interval == 0:
-            try:
-                analysis = DeepFace.analyze(
-                    frame,
-                    actions=['emotion'],
-                    enforce_detection=False,
-                    silent=True
-                )
-                emotion = analysis[0]['dominant_emotion']
-                emotion_scores = analysis[0]['emotion']
-                emotion_tally[emotion] += 1
-
-                # 1. First frame where fear > 50%
-                if not fear_snapshot_taken and emotion_scores.get("fear", 0) > 50:
-                    cv2.imwrite(f"interview_agent/output/frames/fear_over_50_frame_{frame_idx}.jpg", frame)
-                    fear_snapshot_taken = True
-
-                # 2. Peak happy frame
-                if emotion_scores.get("happy", 0) > peak_happy_score:
-                    peak_happy_score = emotion_scores["happy"]
-                    peak_happy_frame = frame_idx
-                    peak_happy_img = frame.copy()
-
-                # 3. Frame of highest stress mix
-                stress_score = emotion_scores.get("fear", 0) + emotion_scores.get("angry", 0) + emotion_scores.get("sad", 0)
-                if stress_score > peak_stress_score:
-                    peak_stress_score = stress_score
-                    peak_stress_frame = frame_idx
-                    peak_stress_img = frame.copy()
-
-            except Exception as e:
-                print(f"Frame {frame_idx}: Error -> {e}")
+    # Face crops of the sampled frames are classified in batches
+    for frame_idx, frame, emotion_scores in scan_emotions(sample_frames(cap, analysis_fps)):
+        emotion = dominant_emotion(emotion_scores)
+        emotion_tally[emotion] += 1
 
-        frame_idx += 1
-        pbar.update(1)
+        # 1. First frame where fear > 50%
+        if fear_snapshot is None and emotion_scores.get("fear", 0) > 50:
+            fear_snapshot = Snapshot("fear_over_50", frame_idx, encode_jpeg(frame))
 
-    # Save peak emotion frames
-    if peak_happy_img is not None:
-        cv2.imwrite(f"interview_agent/output/frames/peak_happy_frame_{peak_happy_frame}.jpg", peak_happy_img)
+        # 2. Peak happy frame
+        if emotion_scores.get("happy", 0) > peak_happy_score:
+            peak_happy_score = emotion_scores["happy"]
+            peak_happy_frame = frame_idx
+            peak_happy_img = frame
 
-    if peak_stress_img is not None:
-        cv2.imwrite(f"interview_agent/output/frames/peak_stress_frame_{peak_stress_frame}.jpg", peak_stress_img)
+        # 3. Frame of highest stress mix
+        stress_score = emotion_scores.get("fear", 0) + emotion_scores.get("angry", 0) + emotion_scores.get("sad", 0)
+        if stress_score > peak_stress_score:
+            peak_stress_score = stress_score
+            peak_stress_frame = frame_idx
+            peak_stress_img = frame
 
     cap.release()
-    pbar.close()
+
+    snapshots = [fear_snapshot] if fear_snapshot is not None else []
+    # Peak frames are only encoded once the peak is known
+    if peak_happy_img is not None:
+        snapshots.append(Snapshot("peak_happy", peak_happy_frame, encode_jpeg(peak_happy_img)))
+    if peak_stress_img is not None:
+        snapshots.append(Snapshot("peak_stress", peak_stress_frame, encode_jpeg(peak_stress_img)))
 
     total_detections = sum(emotion_tally.values())
     emotion_distribution = {
@@ -84,22 +178,20 @@ def analyze_emotional_state(video_path, frame_interval=30):
         for emo, count in emotion_tally.items()
     }
 
-    result = {
-        "emotion_distribution": emotion_distribution,
-        "confidence_inference": infer_confidence(emotion_distribution),
-        "stress_inference": infer_stress(emotion_distribution),
-        "snapshots": {
-            "fear_over_50_frame": f"frame_{frame_idx}" if fear_snapshot_taken else "not_found",
-            "peak_happy_frame": peak_happy_frame,
-            "peak_stress_frame": peak_stress_frame
-        }
-    }
-
-    os.makedirs("interview_agent/output", exist_ok=True)
-    with open("interview_agent/output/confidence_stress_analysis.json", "w") as f:
-        json.dump(result, f, indent=2)
+    result = EmotionAnalysis(
+        emotion_distribution=emotion_distribution,
+        confidence_inference=infer_confidence(emotion_distribution),
+        stress_inference=infer_stress(emotion_distribution),
+        snapshots=snapshots,
+        frames_analyzed=total_detections
+    )
 
-    print("✅ Analysis complete. Results and frames saved to: interview_agent/output/")
+    if output_dir is not None:
+        result.save(output_dir)
+        print(f"✅ Analysis complete ({total_detections} frames at {analysis_fps} fps). Results and frames saved to: {output_dir}")
+    else:
+        print(f"✅ Analysis complete ({total_detections} frames at {analysis_fps} fps)")
+    return result
 
 def infer_confidence(emotions):
     confident_emotions = emotions.get("happy", 0) + emotions.get("neutral", 0)
@@ -126,5 +218,6 @@ def infer_stress(emotions):
 if __name__ == "__main__":
     analyze_emotional_state(
         r"C:\Users\Mohammed\OneDrive - Nile University\Desktop\grad\interview_agent\Emaraty.mp4",
-        frame_interval=5
+        analysis_fps=2,
+        output_dir="interview_agent/output"
     )
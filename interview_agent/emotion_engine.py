@@ -0,0 +1,165 @@
+import os
+
+import cv2
+import numpy as np
+
+# Order of the DeepFace emotion model's outputs
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+# Face crops classified per model call
+EMOTION_BATCH_SIZE = int(os.getenv("EMOTION_BATCH_SIZE", "32"))
+# Sampled frames between full-frame face detections; in between the face is
+# only searched for around where it was last seen
+EMOTION_REDETECT_EVERY = int(os.getenv("EMOTION_REDETECT_EVERY", "15"))
+# The search region around the last face, as a fraction of the face size
+SEARCH_MARGIN = 0.5
+EMOTION_INPUT_SIZE = 48
+
+_face_detector = None
+_emotion_model = None
+
+
+def get_face_detector():
+    # The same Haar cascade DeepFace.analyze uses with its default "opencv" backend
+    global _face_detector
+    if _face_detector is None:
+        _face_detector = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml"))
+    return _face_detector
+
+
+def get_emotion_model():
+    """
+    The Keras emotion classifier behind DeepFace.analyze(actions=['emotion']),
+    loaded once.
+    """
+    global _emotion_model
+    if _emotion_model is None:
+        from deepface import DeepFace
+        try:
+            model = DeepFace.build_model(model_name="Emotion", task="facial_attribute")
+        except TypeError:
+            # Older DeepFace releases take only the model name
+            model = DeepFace.build_model("Emotion")
+        # Newer releases wrap the Keras model in a client object
+        _emotion_model = getattr(model, "model", model)
+    return _emotion_model
+
+
+def _largest(faces):
+    if len(faces) == 0:
+        return None
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    return int(x), int(y), int(w), int(h)
+
+
+class FaceTracker:
+    """
+    Follows the candidate's face: a full-frame detection every `redetect_every`
+    frames or after the face was lost, otherwise a detection restricted to a
+    small region around the last box.
+    """
+
+    def __init__(self, redetect_every=EMOTION_REDETECT_EVERY, margin=SEARCH_MARGIN):
+        self.redetect_every = redetect_every
+        self.margin = margin
+        self.box = None
+        self.since_detect = 0
+
+    def locate(self, gray):
+        """
+        Returns:
+            tuple: (x, y, w, h) of the face, or None when there is none
+        """
+        detector = get_face_detector()
+        if self.box is not None and self.since_detect < self.redetect_every:
+            x, y, w, h = self.box
+            mx, my = int(w * self.margin), int(h * self.margin)
+            x0, y0 = max(0, x - mx), max(0, y - my)
+            x1, y1 = min(gray.shape[1], x + w + mx), min(gray.shape[0], y + h + my)
+            face = _largest(detector.detectMultiScale(gray[y0:y1, x0:x1], 1.1, 5, minSize=(w // 2, h // 2)))
+            self.since_detect += 1
+            if face is not None:
+                self.box = (face[0] + x0, face[1] + y0, face[2], face[3])
+                return self.box
+
+        self.box = _largest(detector.detectMultiScale(gray, 1.1, 5, minSize=(30, 30)))
+        self.since_detect = 0
+        return self.box
+
+
+def face_crop(frame, tracker):
+    """
+    The face region of a BGR frame as the classifier's input: 48x48 grayscale
+    in [0, 1]. Like DeepFace.analyze(enforce_detection=False), the whole frame
+    is used when no face is found.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    box = tracker.locate(gray)
+    if box is not None:
+        x, y, w, h = box
+        gray = gray[y:y + h, x:x + w]
+    crop = cv2.resize(gray, (EMOTION_INPUT_SIZE, EMOTION_INPUT_SIZE))
+    return crop.astype(np.float32) / 255.0
+
+
+def classify_crops(crops):
+    """
+    Returns:
+        list: One {emotion: percent} dict per crop, like DeepFace.analyze's "emotion"
+    """
+    batch = np.stack(crops)[..., None]
+    probabilities = np.asarray(get_emotion_model().predict_on_batch(batch))
+    return [
+        {label: float(p) * 100 for label, p in zip(EMOTION_LABELS, row)}
+        for row in probabilities
+    ]
+
+
+def scan_emotions(frames, batch_size=EMOTION_BATCH_SIZE):
+    """
+    Classify the candidate's emotion in a stream of frames, batching the
+    face crops.
+
+    Args:
+        frames (iterable): (frame_idx, BGR frame) pairs
+        batch_size (int): Face crops per classifier call
+
+    Yields:
+        tuple: (frame_idx, frame, emotion scores in percent), in input order.
+        Frames that fail to crop or classify are reported and skipped.
+    """
+    tracker = FaceTracker()
+    pending = []
+
+    def flush():
+        try:
+            scores = classify_crops([crop for _, _, crop in pending])
+            results = [(frame_idx, frame, score) for (frame_idx, frame, _), score in zip(pending, scores)]
+        except Exception as e:
+            # Retry one by one so a single bad crop only costs its own frame
+            print(f"Batch of {len(pending)} frames: Error -> {e}")
+            results = []
+            for frame_idx, frame, crop in pending:
+                try:
+                    results.append((frame_idx, frame, classify_crops([crop])[0]))
+                except Exception as e:
+                    print(f"Frame {frame_idx}: Error -> {e}")
+        pending.clear()
+        return results
+
+    for frame_idx, frame in frames:
+        try:
+            crop = face_crop(frame, tracker)
+        except Exception as e:
+            print(f"Frame {frame_idx}: Error -> {e}")
+            # The next frame starts from a full-frame detection
+            tracker.box = None
+            continue
+        pending.append((frame_idx, frame, crop))
+        if len(pending) >= batch_size:
+            yield from flush()
+    if pending:
+        yield from flush()
+
+
+def dominant_emotion(scores):
+    return max(scores, key=scores.get)
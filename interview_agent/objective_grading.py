@@ -0,0 +1,129 @@
+import re
+from typing import Dict, List, Optional
+
+# Question type names used by the generator, the Supabase payload and clients
+TYPE_ALIASES = {
+    "mcq": "mcq",
+    "multiple_choice": "mcq",
+    "true_false": "true_false",
+    "essay": "essay",
+    "coding": "coding",
+}
+
+# "A) option" lines of an MCQ question, as written by the question generator
+OPTION_LINE = re.compile(r"^\s*([A-Z])\)\s*(.*)$")
+# "B) ...", "The correct answer is B) ...", "The correct answer is: A) ..."
+GOLDEN_LETTER = re.compile(r"^\s*(?:the\s+correct\s+answer\s+is\s*:?\s*)?\(?([A-Z])\)", re.IGNORECASE)
+# "True. ...", "False, because ..."
+BOOLEAN_WORD = re.compile(r"^\s*(true|false)\b", re.IGNORECASE)
+# A golden answer that is nothing but "True" / "False."; "True parallelism requires ..." is an essay
+BOOLEAN_ONLY = re.compile(r"^\s*(true|false)\s*[.!]?\s*$", re.IGNORECASE)
+# "B", "b)", "(B)", "B.", "Option B", "Answer: B"
+CANDIDATE_LETTER = re.compile(r"^\s*(?:(?:option|answer)\s*:?\s*)?\(?([A-Za-z])\)?\s*[.):]?\s*$", re.IGNORECASE)
+CANDIDATE_LETTER_PREFIX = re.compile(r"^\s*\(?([A-Z])\)")
+
+
+def parse_options(question: str) -> List[str]:
+    """
+    Option texts of an MCQ question, in letter order.
+    """
+    return [match.group(2).strip() for match in map(OPTION_LINE.match, question.split("\n")[1:]) if match]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", str(text)).strip().strip(".").lower()
+
+
+def question_type(question: str, golden_answer: str, declared: Optional[str] = None) -> Optional[str]:
+    """
+    "mcq", "true_false", "essay" or "coding". Without a declared type, MCQ and
+    true/false are recognized from the generator's fixed formats (a true/false
+    golden answer is the bare word), and anything else is returned as None
+    (graded by the LLM).
+    """
+    if declared:
+        return TYPE_ALIASES.get(declared.strip().lower(), declared)
+    if len(parse_options(question)) >= 2 and GOLDEN_LETTER.match(golden_answer or ""):
+        return "mcq"
+    if BOOLEAN_ONLY.match(golden_answer or ""):
+        return "true_false"
+    return None
+
+
+def _candidate_option(answer, options: List[str]) -> Optional[int]:
+    """
+    Index of the option the candidate picked: a letter, the option's text or
+    its 0-based index as a number (like the Supabase payload's correctAnswer).
+    None when the answer is none of these. Without the option list (a question
+    stored without its options) only letters and indices are understood.
+    """
+    limit = len(options) if options else 26
+    if isinstance(answer, bool):
+        return None
+    if isinstance(answer, int):
+        return answer if 0 <= answer < limit else None
+    text = str(answer).strip()
+    match = CANDIDATE_LETTER.match(text) or CANDIDATE_LETTER_PREFIX.match(text)
+    if match:
+        index = ord(match.group(1).upper()) - ord("A")
+        return index if index < limit else None
+    normalized = _normalize(text)
+    for index, option in enumerate(options):
+        if normalized == _normalize(option):
+            return index
+    return None
+
+
+def _candidate_boolean(answer) -> Optional[bool]:
+    if isinstance(answer, bool):
+        return answer
+    if isinstance(answer, int):
+        # Index into ["True", "False"]
+        return {0: True, 1: False}.get(answer)
+    match = BOOLEAN_WORD.match(str(answer))
+    if match:
+        return match.group(1).lower() == "true"
+    return {"t": True, "f": False}.get(str(answer).strip().lower())
+
+
+def _verdict(correct: bool, reasoning: str) -> Dict:
+    return {
+        "verdict": "Correct" if correct else "Incorrect",
+        "reasoning": reasoning,
+        "thought_process_considered": "No, objectively graded",
+        "graded_by": "rule"
+    }
+
+
+def grade_objective(question: str, golden_answer: str, candidate_answer, qtype: Optional[str]) -> Optional[Dict]:
+    """
+    Grade an MCQ or true/false answer without the LLM.
+
+    Returns:
+        dict: Evaluation in the LLM grader's schema plus "graded_by": "rule",
+              or None when the question or the answer cannot be checked
+              mechanically and has to go to the LLM
+    """
+    if qtype == "mcq":
+        options = parse_options(question)
+        golden = GOLDEN_LETTER.match(golden_answer or "")
+        if not golden:
+            return None
+        correct = ord(golden.group(1).upper()) - ord("A")
+        picked = _candidate_option(candidate_answer, options)
+        if picked is None:
+            return None
+        letter = chr(ord("A") + picked)
+        expected = chr(ord("A") + correct)
+        selected = f"{letter}) {options[picked]}" if options else f"{letter})"
+        return _verdict(picked == correct, f"Selected {selected}; the correct option is {expected}).")
+
+    if qtype == "true_false":
+        golden = BOOLEAN_WORD.match(golden_answer or "")
+        picked = _candidate_boolean(candidate_answer)
+        if not golden or picked is None:
+            return None
+        expected = golden.group(1).lower() == "true"
+        return _verdict(picked == expected, f"Answered {picked}; the statement is {expected}.")
+
+    return None
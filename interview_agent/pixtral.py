@@ -1,8 +1,6 @@
 import os
-import json
-import glob
-import time
 from mistralai import Mistral
+from interview_agent.emotion import EmotionAnalysis
 
 # === Configuration ===
 MODEL_NAME = "pixtral-12b-2409"
@@ -10,25 +8,18 @@ from dotenv import load_dotenv
 load_dotenv()
 API_KEY = os.getenv("MISTRAL_API_KEY")
 
-def load_confidence_stress_report(report_path: str) -> dict:
-    with open(report_path, 'r') as f:
-        return json.load(f)
-
-def get_snapshot_images(frames_dir: str):
-    return sorted(glob.glob(os.path.join(frames_dir, "*.jpg")))
-
-def format_messages(metadata: dict, image_paths: list) -> list:
+def format_messages(metadata: dict, snapshots: list) -> list:
     emotions = metadata.get("emotion_distribution", {})
     confidence = metadata.get("confidence_inference", "Unknown")
     stress = metadata.get("stress_inference", "Unknown")
-    snapshots = metadata.get("snapshots", {})
+    snapshot_frames = metadata.get("snapshots", {})
 
     emotion_summary = "\n".join([f"- {k}: {v}%" for k, v in emotions.items()])
     snapshot_summary = [
-        f"Total snapshot frames: {len(image_paths)}",
-        f"Fear >50% Frame: {snapshots.get('fear_over_50_frame', 'Not detected')}",
-        f"Peak Happy Frame: {snapshots.get('peak_happy_frame', 'Not detected')}",
-        f"Peak Stress Frame: {snapshots.get('peak_stress_frame', 'Not detected')}"
+        f"Total snapshot frames: {len(snapshots)}",
+        f"Fear >50% Frame: {snapshot_frames.get('fear_over_50_frame', 'Not detected')}",
+        f"Peak Happy Frame: {snapshot_frames.get('peak_happy_frame', 'Not detected')}",
+        f"Peak Stress Frame: {snapshot_frames.get('peak_stress_frame', 'Not detected')}"
     ]
 
     system_prompt = (
@@ -54,34 +45,26 @@ Based on the above data, write a professional and concise evaluation of the cand
         {"role": "user", "content": user_prompt}
     ]
 
-def analyze_with_pixtral_model(output_dir: str):
-    # Paths
-    time.sleep(2)
-    report_path = os.path.join(output_dir, "confidence_stress_analysis.json")
-    frames_dir = os.path.join(output_dir, "frames")
-    time.sleep(2)
-    if not os.path.exists(report_path) or not os.path.exists(frames_dir):
-        print("❌ Required files not found.")
-        return
+def analyze_with_pixtral_model(analysis) -> str:
+    """
+    Summarize an emotion scan.
+
+    Args:
+        analysis (EmotionAnalysis): Result of analyze_emotional_state, or the
+            directory it was saved to
 
-    # Load data
-    metadata = load_confidence_stress_report(report_path)
-    image_paths = get_snapshot_images(frames_dir)
-    messages = format_messages(metadata, image_paths)
+    Returns:
+        str: The summary
+    """
+    if isinstance(analysis, str):
+        analysis = EmotionAnalysis.load(analysis)
+    messages = format_messages(analysis.to_dict(), analysis.snapshots)
 
     # Connect to Pixtral model via Mistral
     client = Mistral(api_key=API_KEY)
     response = client.chat.complete(model=MODEL_NAME, messages=messages)
 
-    summary_text = response.choices[0].message.content.strip()
-
-    # Save output
-    output_path = os.path.join(output_dir, "pixtral_summary.txt")
-    return summary_text
-    with open(output_path, "w") as f:
-        f.write(summary_text)
-
-    print(f"✅ Pixtral summary generated and saved to: {output_path}")
+    return response.choices[0].message.content.strip()
 
 if __name__ == "__main__":
-    analyze_with_pixtral_model("output")
+    print(analyze_with_pixtral_model("output"))
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+# LLM calls in flight at once, and the request rate the provider allows
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "300"))
+# Attempts after a 429 before giving up, and the first backoff in seconds (doubled each time)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_SEC = float(os.getenv("LLM_BACKOFF_SEC", "1"))
+MAX_BACKOFF_SEC = 60
+
+
+def is_rate_limited(error) -> bool:
+    """
+    Whether an exception is the provider's 429, for the OpenAI/httpx style
+    errors LangChain passes through.
+    """
+    if type(error).__name__ == "RateLimitError":
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+def retry_after(error):
+    """
+    Seconds the provider asked us to wait, None when it did not say.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Paces async calls to a rate-limited API: at most `max_concurrency` in
+    flight per event loop, requests spread out by a token bucket refilled at
+    `requests_per_minute` and shared by all loops and threads, and 429
+    responses retried with exponential backoff.
+
+    Args:
+        max_concurrency (int): Calls running at once in each event loop
+        requests_per_minute (float): Sustained request rate; bursts up to
+            max_concurrency requests are allowed
+        max_retries (int): Retries of a rate-limited call before its error is raised
+        backoff (float): First wait after a 429 in seconds, doubled on every retry
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 max_retries=LLM_MAX_RETRIES, backoff=LLM_BACKOFF_SEC):
+        self.max_concurrency = max_concurrency
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.retries = 0
+        # The bucket is shared by every event loop using this limiter (sync
+        # callers run asyncio.run per call, possibly from several threads at
+        # once), so it is guarded by a thread lock; asyncio primitives belong
+        # to one loop, so each loop gets its own semaphore
+        self._state_lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        with self._state_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+    async def acquire(self):
+        """
+        Take a token of the bucket, waiting until it has been refilled. Tokens
+        are reserved in call order, so the bucket may go negative.
+        """
+        with self._state_lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def call(self, fn, *args, **kwargs):
+        """
+        Await fn(*args, **kwargs) under the limits, retrying on 429.
+        """
+        semaphore = self._semaphore()
+        attempt = 0
+        async with semaphore:
+            while True:
+                await self.acquire()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt >= self.max_retries:
+                        raise
+                    wait = retry_after(e)
+                    if wait is None:
+                        # Jitter keeps the retries of a burst from colliding again
+                        wait = min(MAX_BACKOFF_SEC, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+                    attempt += 1
+                    with self._state_lock:
+                        self.retries += 1
+                    print(f"Rate limited, retry {attempt}/{self.max_retries} in {wait:.1f}s")
+                    await asyncio.sleep(wait)
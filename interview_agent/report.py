@@ -1,14 +1,46 @@
 from interview_agent.technical_depth_analysis import run_exam_pipeline
-from interview_agent.speech_to_text import transcribe_mp3
-from interview_agent.emotion import analyze_emotional_state
-from interview_agent.pixtral import analyze_with_pixtral_model
+from interview_agent.speech_to_text import transcribe_mp3, WHISPER_MODEL, WHISPER_BACKEND
+from interview_agent.audio_prep import AUDIO_VAD, MAX_CHUNK_SEC
+from interview_agent.emotion import analyze_emotional_state, EMOTION_ANALYSIS_FPS
+from interview_agent.pixtral import analyze_with_pixtral_model, MODEL_NAME as PIXTRAL_MODEL
 from interview_agent.sentiment_analysis import format_analysis_report
-from interview_agent.sentiment_analysis import analyze_interview_advanced
+from interview_agent.sentiment_analysis import analyze_interview_advanced, llm as sentiment_llm
+from interview_agent.dag import Stage, run_dag
 from datetime import datetime
+import asyncio
 import os
 import requests
 from openai import OpenAI
 
+# Bump when a change to the workflow changes reports for the same video
+ANALYSIS_VERSION = 2
+REPORT_MODEL = "gpt-4-turbo"
+
+
+def emotional_analysis_params() -> dict:
+    """
+    Everything besides the video that changes an emotional analysis; part of its cache key.
+    """
+    return {
+        "version": ANALYSIS_VERSION,
+        "analysis_fps": EMOTION_ANALYSIS_FPS,
+        "pixtral_model": PIXTRAL_MODEL
+    }
+
+
+def workflow_params() -> dict:
+    """
+    Everything besides the video that changes an interview report; part of its cache key.
+    """
+    return dict(
+        emotional_analysis_params(),
+        whisper_model=WHISPER_MODEL,
+        whisper_backend=WHISPER_BACKEND,
+        audio_vad=AUDIO_VAD,
+        audio_max_chunk_sec=MAX_CHUNK_SEC,
+        sentiment_model=sentiment_llm.model_name,
+        report_model=REPORT_MODEL
+    )
 
 
 # def update_supabase_profile( payload: dict):
@@ -52,7 +84,7 @@ You are a professional technical writer. Your task is to take a raw interview an
 """
 
     response = client.chat.completions.create(
-        model="gpt-4-turbo",
+        model=REPORT_MODEL,
         messages=[
             {"role": "system", "content": "You are a professional report formatter."},
             {"role": "user", "content": prompt}
@@ -64,29 +96,56 @@ You are a professional technical writer. Your task is to take a raw interview an
 
 
 
-def analyze_video_workflow(video_path: str) -> dict:
+def sentiment_report(transcript: str) -> str:
+    return format_analysis_report(analyze_interview_advanced(transcript))
+
+
+def workflow_stages(video_path: str, output_dir: str = None) -> list:
+    """
+    The interview analysis as a dependency graph:
+
+        transcribe -> sentiment --------\
+                                         beautify
+        emotion    -> pixtral ----------/
+
+    Transcription and the emotion scan are independent, and each LLM
+    analysis only waits for its own input. The emotion scan reaches Pixtral
+    in memory; output_dir additionally saves it to disk.
+    """
+    return [
+        Stage("transcribe", transcribe_mp3, args=(video_path,)),
+        Stage("emotion", analyze_emotional_state, args=(video_path, EMOTION_ANALYSIS_FPS, output_dir), executor="process"),
+        Stage("sentiment", sentiment_report, deps=("transcribe",)),
+        Stage("pixtral", analyze_with_pixtral_model, deps=("emotion",)),
+        Stage("beautify", beautify_analysis_with_llm, deps=("sentiment", "pixtral"))
+    ]
+
+
+async def run_video_workflow(video_path: str, output_dir: str = None):
+    """
+    Run the interview analysis DAG.
+
+    Returns:
+        tuple: (beautified report, per-stage timings)
+    """
+    results, timings = await run_dag(workflow_stages(video_path, output_dir))
+    return results["beautify"], timings
+
+
+def analyze_video_workflow(video_path: str, output_dir: str = None) -> dict:
     """
     Wrapper function to perform a complete analysis on a video.
     
-    Workflow:
-    1. Transcribe video audio using transcribe_mp3.
-    2. Analyze sentiment from the transcribed text.
-    3. Analyze emotional state from the video.
+    Workflow (see workflow_stages):
+    1. Transcribe video audio using transcribe_mp3, and analyze sentiment from the transcribed text.
+    2. In parallel, analyze emotional state from the video and summarize it with Pixtral.
+    3. Merge both into one report.
     
     Returns:
         dict: A dictionary containing the transcript, sentiment analysis, and emotional insights.
     """
-    # Step 1: Transcription
-    transcript = transcribe_mp3(video_path)
-
-    sentiment_result = analyze_interview_advanced(transcript)
-    emotional_state_result = analyze_emotional_state(video_path, 2)
-    raw_sentiment = format_analysis_report(sentiment_result)
-    raw_pixtral = analyze_with_pixtral_model("interview_agent/output")
-
-    beautified_report = beautify_analysis_with_llm(raw_sentiment, raw_pixtral)
-
-    return beautified_report
+    report, _ = asyncio.run(run_video_workflow(video_path, output_dir))
+    return report
     
 
     # update_supabase_profile(result)
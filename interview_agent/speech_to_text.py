@@ -1,14 +1,65 @@
-import whisper
 import tempfile
 import shutil
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from fastapi import UploadFile
 import os
-# Load Whisper model once at module level
+
+from interview_agent.audio_prep import prepare_audio, to_source_time
 
 from dotenv import load_dotenv
 load_dotenv()
 Eleven_API_KEY = os.getenv("ELEVEN_API_KEY")
-model = whisper.load_model("base")  # or "small", "medium", "large"
+
+# Whisper settings: model size ("tiny", "base", "small", "medium", "large"), and
+# backend: "openai" (openai-whisper, PyTorch) or "faster-whisper" (CTranslate2)
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "openai")
+# faster-whisper only: "int8" is the fast CPU choice, "float16" for GPUs
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# Comma-separated sizes loaded at startup
+WHISPER_PRELOAD = [size for size in os.getenv("WHISPER_PRELOAD", WHISPER_MODEL).split(",") if size]
+if WHISPER_BACKEND not in ("openai", "faster-whisper"):
+    raise ValueError(f"Unsupported Whisper backend: {WHISPER_BACKEND}")
+# Recordings with several speech chunks are transcribed in parallel by this
+# many worker processes, each holding its own model; 0 keeps everything in-process
+CPU_COUNT = os.cpu_count() or 1
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", str(min(2, max(1, CPU_COUNT // 2)))))
+
+# Loaded models, shared by every request: (backend, size) -> (model, lock)
+_whisper_models = {}
+_registry_lock = threading.Lock()
+
+
+def get_whisper_model(size: str = WHISPER_MODEL, backend: str = WHISPER_BACKEND):
+    """
+    Load a Whisper model once per size and backend and reuse it afterwards.
+
+    Returns:
+        tuple: (model, lock); openai-whisper models must be used under the lock,
+               because transcribe() installs hooks on the shared model
+    """
+    key = (backend, size)
+    with _registry_lock:
+        if key not in _whisper_models:
+            print(f"Loading Whisper {size} ({backend})")
+            if backend == "faster-whisper":
+                from faster_whisper import WhisperModel
+                model = WhisperModel(size, device="cpu", compute_type=WHISPER_COMPUTE_TYPE)
+            else:
+                import whisper
+                model = whisper.load_model(size)
+            _whisper_models[key] = (model, threading.Lock())
+        return _whisper_models[key]
+
+
+def warm_whisper_models():
+    """
+    Load the WHISPER_PRELOAD sizes, so the first request does not pay for it.
+    """
+    for size in WHISPER_PRELOAD:
+        get_whisper_model(size)
 
 # def transcribe_mp3(uploaded_file: UploadFile) -> str:
 #     # Save the file to a temporary path
@@ -24,10 +75,103 @@ model = whisper.load_model("base")  # or "small", "medium", "large"
 
 #     return result["text"]
 
-def transcribe_mp3(video_path: str) -> str:
-    model = whisper.load_model("base")  # or "small", "medium", "large"
-    result = model.transcribe(video_path)
-    return result["text"]
+def _transcribe_chunk(model, lock, audio):
+    """
+    Returns:
+        list: (start_sec, end_sec, text) per segment, in chunk time
+    """
+    if WHISPER_BACKEND == "faster-whisper":
+        # CTranslate2 models can be shared between threads; segments are decoded lazily
+        segments, _ = model.transcribe(audio)
+        return [(segment.start, segment.end, segment.text) for segment in segments]
+    with lock:
+        result = model.transcribe(audio)
+    return [(segment["start"], segment["end"], segment["text"]) for segment in result["segments"]]
+
+
+_transcribe_pool = None
+_local_pool = None
+
+
+def _init_transcribe_worker(size):
+    """
+    Runs once in every transcription worker: splits the cores between workers
+    and loads the model before the first chunk arrives.
+    """
+    threads = max(1, CPU_COUNT // max(1, TRANSCRIBE_WORKERS))
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if WHISPER_BACKEND == "openai":
+        import torch
+        torch.set_num_threads(threads)
+    get_whisper_model(size)
+
+
+def _transcribe_audio(audio, size):
+    model, lock = get_whisper_model(size)
+    return _transcribe_chunk(model, lock, audio)
+
+
+def submit_chunks(chunks: list, size: str = WHISPER_MODEL) -> list:
+    """
+    Start transcribing speech chunks (see audio_prep.speech_chunks).
+
+    Returns:
+        list: One concurrent.futures.Future per chunk, in order, resolving to
+              the chunk's (start_sec, end_sec, text) segments in chunk time
+    """
+    global _transcribe_pool, _local_pool
+    if len(chunks) > 1 and TRANSCRIBE_WORKERS > 0:
+        if _transcribe_pool is None:
+            _transcribe_pool = ProcessPoolExecutor(
+                max_workers=TRANSCRIBE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_transcribe_worker,
+                initargs=(size,)
+            )
+        executor = _transcribe_pool
+    else:
+        # A single chunk is not worth the round trip, the shared model handles it
+        if _local_pool is None:
+            _local_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="transcribe")
+        executor = _local_pool
+    return [executor.submit(_transcribe_audio, chunk["audio"], size) for chunk in chunks]
+
+
+def stitch_segments(chunk: dict, segments: list) -> list:
+    """
+    Map a chunk's (start_sec, end_sec, text) segments to {start, end, text}
+    in the time of the original recording.
+    """
+    return [
+        {
+            "start": round(to_source_time(chunk, start), 2),
+            "end": round(to_source_time(chunk, end), 2),
+            "text": text
+        }
+        for start, end, text in segments
+    ]
+
+
+def transcribe_segments(video_path: str, size: str = WHISPER_MODEL) -> dict:
+    """
+    Transcribe only the speech of a recording (see audio_prep.prepare_audio),
+    its chunks in parallel.
+
+    Returns:
+        dict: "segments" ({start, end, text} with times in the original
+              recording), "duration_sec" and "speech_sec"
+    """
+    audio = prepare_audio(video_path)
+    futures = submit_chunks(audio["chunks"], size)
+    segments = []
+    for chunk, future in zip(audio["chunks"], futures):
+        segments += stitch_segments(chunk, future.result())
+    return {"segments": segments, "duration_sec": audio["duration_sec"], "speech_sec": audio["speech_sec"]}
+
+
+def transcribe_mp3(video_path: str, size: str = WHISPER_MODEL) -> str:
+    transcription = transcribe_segments(video_path, size)
+    return "".join(segment["text"] for segment in transcription["segments"])
 
 
 from elevenlabs.client import ElevenLabs
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import List, Dict
 from langchain_openai import ChatOpenAI
@@ -6,6 +7,8 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import Runnable
 import os
 from dotenv import load_dotenv
+from interview_agent.rate_limit import RateLimiter
+from interview_agent.objective_grading import grade_objective, question_type
 
 # Load environment variables
 load_dotenv()
@@ -30,20 +33,60 @@ Return a JSON object:
 """)
 evaluate_chain: Runnable = evaluate_prompt | llm | JsonOutputParser()
 
+# Shared by every exam, so concurrent requests together stay within the provider's limits
+grading_limiter = RateLimiter()
+
+
+def failed_evaluation(error: Exception) -> Dict:
+    """
+    Evaluation recorded for an answer whose grading call failed; it counts as
+    incorrect and carries the error.
+    """
+    return {
+        "verdict": "Ungraded",
+        "reasoning": f"Evaluation failed: {error}",
+        "thought_process_considered": "No",
+        "graded_by": "llm",
+        "error": str(error)
+    }
+
+
+async def aevaluate_answer_batch(
+    questions: List[str],
+    golden_answers: List[str],
+    candidate_answers: List[str],
+    limiter: RateLimiter = None
+) -> List[Dict]:
+    """
+    Grade all answers concurrently, paced by the limiter. Results are in the
+    order of the questions, and a failed answer does not affect the others.
+    """
+    limiter = limiter or grading_limiter
+
+    async def evaluate(q, gold, cand):
+        try:
+            evaluation = await limiter.call(evaluate_chain.ainvoke, {
+                "question": q,
+                "golden_answer": gold,
+                "candidate_answer": cand
+            })
+            evaluation["graded_by"] = "llm"
+            return evaluation
+        except Exception as e:
+            print(f"Evaluation failed: {e}")
+            return failed_evaluation(e)
+
+    return await asyncio.gather(*(
+        evaluate(q, gold, cand) for q, gold, cand in zip(questions, golden_answers, candidate_answers)
+    ))
+
+
 def evaluate_answer_batch(
     questions: List[str],
     golden_answers: List[str],
     candidate_answers: List[str]
 ) -> List[Dict]:
-    evaluations = []
-    for q, gold, cand in zip(questions, golden_answers, candidate_answers):
-        result = evaluate_chain.invoke({
-            "question": q,
-            "golden_answer": gold,
-            "candidate_answer": cand
-        })
-        evaluations.append(result)
-    return evaluations
+    return asyncio.run(aevaluate_answer_batch(questions, golden_answers, candidate_answers))
 
 # === 🧠 Function 2: Exam-Level Technical Summary ===
 exam_summary_prompt = ChatPromptTemplate.from_template("""
@@ -70,8 +113,14 @@ def generate_exam_summary(qa_and_eval: List[Dict]) -> str:
         "exam_data": json.dumps(qa_and_eval, indent=2)
     }).content
 
+async def agenerate_exam_summary(qa_and_eval: List[Dict]) -> str:
+    response = await grading_limiter.call(exam_summary_chain.ainvoke, {
+        "exam_data": json.dumps(qa_and_eval, indent=2)
+    })
+    return response.content
+
 # === ✅ Main Function ===
-def run_exam_pipeline(question_list: List[str], golden_answers_list: List[str], candidate_answers: List[str]):
+async def arun_exam_pipeline(question_list: List[str], golden_answers_list: List[str], candidate_answers: List, type_list: List[str] = None):
 
 
     # questions = data["questions"]
@@ -80,9 +129,25 @@ def run_exam_pipeline(question_list: List[str], golden_answers_list: List[str],
     questions = question_list
     golden_answers = golden_answers_list
     assert len(candidate_answers) == len(questions)
+    types = type_list or [None] * len(questions)
+    assert len(types) == len(questions)
+
+    # MCQ and true/false answers are checked locally; the rest (and answers
+    # that cannot be parsed) go to the LLM
+    evaluations = [
+        grade_objective(q, gold, cand, question_type(q, gold, t))
+        for q, gold, cand, t in zip(questions, golden_answers, candidate_answers, types)
+    ]
+    pending = [i for i, evaluation in enumerate(evaluations) if evaluation is None]
 
-    print("🔍 Evaluating each answer...")
-    evaluations = evaluate_answer_batch(questions, golden_answers, candidate_answers)
+    print(f"🔍 Evaluating each answer ({len(questions) - len(pending)} graded locally)...")
+    llm_evaluations = await aevaluate_answer_batch(
+        [questions[i] for i in pending],
+        [golden_answers[i] for i in pending],
+        [candidate_answers[i] for i in pending]
+    )
+    for i, evaluation in zip(pending, llm_evaluations):
+        evaluations[i] = evaluation
 
     combined = []
     for i in range(len(questions)):
@@ -94,7 +159,7 @@ def run_exam_pipeline(question_list: List[str], golden_answers_list: List[str],
         })
 
     print("🧠 Generating exam-level technical feedback...")
-    exam_summary = generate_exam_summary(combined)
+    exam_summary = await agenerate_exam_summary(combined)
     final_grade = calculate_grade(combined)
 
     result = {
@@ -102,11 +167,18 @@ def run_exam_pipeline(question_list: List[str], golden_answers_list: List[str],
         "exam_summary": exam_summary,
         "final_grade": final_grade
     }
+    ungraded = [i for i, ev in enumerate(evaluations) if "error" in ev]
+    if ungraded:
+        result["ungraded_questions"] = ungraded
 
 
     print("\n📋 Exam Summary:\n")
     print(result)
     return result
+
+def run_exam_pipeline(question_list: List[str], golden_answers_list: List[str], candidate_answers: List, type_list: List[str] = None):
+    return asyncio.run(arun_exam_pipeline(question_list, golden_answers_list, candidate_answers, type_list))
+
 def calculate_grade(evaluations: List[Dict]) -> float:
     score = 0.0
     for ev in evaluations:
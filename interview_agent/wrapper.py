@@ -91,7 +91,7 @@ def analyze_video_workflow(video_path: str) -> dict:
     # Step 3: Emotional State Analysis
     emotional_insights = analyze_emotional_state(video_path, 2)
 
-    pixtral_insights = analyze_with_pixtral_model("C:\\Users\\Mohammed\\OneDrive - Nile University\\Desktop\\grad\\interview_agent\\output")
+    pixtral_insights = analyze_with_pixtral_model(emotional_insights)
 
     # Final result
     return  {